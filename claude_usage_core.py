@@ -0,0 +1,1511 @@
+"""Tk-free core of the Claude usage widget.
+
+Config, the API transports, fetching with retries and a circuit breaker,
+and the polling loop live here so they run without a display.
+claude_usage_overlay.py builds the desktop widget on top of UsageMonitor;
+running this module directly starts a headless monitor instead:
+
+    python claude_usage_core.py --output usage.json
+    python claude_usage_core.py --once
+"""
+import abc
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import requests
+from urllib.parse import urlsplit
+from datetime import datetime
+from pathlib import Path
+import threading
+import time
+import sys
+import random
+import signal
+import asyncio
+import queue
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+# Wait this long past a saturated window's resets_at before fetching again
+RESET_GRACE_SECONDS = 5
+
+DEFAULT_API_BASE_URL = 'https://claude.ai'
+
+# Browser-like headers sent with every API request (Referer is added per base URL)
+API_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Connection': 'keep-alive',
+    'Sec-Fetch-Dest': 'empty',
+    'Sec-Fetch-Mode': 'cors',
+    'Sec-Fetch-Site': 'same-origin',
+    'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+}
+
+
+class Transport(abc.ABC):
+    """HTTP layer the fetch path goes through.
+
+    A transport is long-lived: headers and cookies are applied once, and the
+    underlying requests session keeps its connections alive between polls.
+    get() takes an API path such as '/api/organizations' and returns a
+    response with status_code, headers and json().
+    """
+
+    def __init__(self, cookie_string, base_url=DEFAULT_API_BASE_URL):
+        self.cookie_string = cookie_string
+        self.base_url = base_url.rstrip('/')
+        self.http = self.create_session()
+        self.http.headers.update(API_HEADERS)
+        self.http.headers['Referer'] = f'{self.base_url}/chats'
+
+        cookie_domain = urlsplit(self.base_url).hostname
+        for cookie_pair in cookie_string.split('; '):
+            if '=' in cookie_pair:
+                name, value = cookie_pair.split('=', 1)
+                self.http.cookies.set(name, value, domain=cookie_domain)
+
+    @abc.abstractmethod
+    def create_session(self):
+        """Return the requests-compatible session to send requests through"""
+
+    def get(self, path, timeout=15):
+        return self.http.get(self.base_url + path, timeout=timeout)
+
+    def close(self):
+        try:
+            self.http.close()
+        except:
+            pass
+
+
+class CloudscraperTransport(Transport):
+    """cloudscraper session, needed to get past Cloudflare on claude.ai"""
+
+    def create_session(self):
+        # Use cloudscraper to bypass Cloudflare
+        try:
+            import cloudscraper
+        except ImportError:
+            import subprocess
+            subprocess.check_call([sys.executable, "-m", "pip", "install", "cloudscraper"])
+            import cloudscraper
+
+        return cloudscraper.create_scraper(
+            browser={
+                'browser': 'chrome',
+                'platform': 'windows',
+                'mobile': False
+            }
+        )
+
+
+class RequestsTransport(Transport):
+    """Plain requests session, for local stand-ins such as mock_claude_server.py"""
+
+    def create_session(self):
+        return requests.Session()
+
+
+# Selected with the 'transport' config key
+TRANSPORTS = {
+    'cloudscraper': CloudscraperTransport,
+    'requests': RequestsTransport,
+}
+
+
+# Usage windows the widget shows (note: the API calls the weekly one 'seven_day')
+USAGE_WINDOWS = ('five_hour', 'seven_day')
+
+
+def parse_reset_time(value):
+    """Parse a resets_at timestamp from the usage API into an aware datetime"""
+    try:
+        # Fast path: the API sends ISO-8601
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        pass
+
+    try:
+        from dateutil import parser as date_parser
+    except ImportError:
+        import subprocess
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "python-dateutil"])
+        from dateutil import parser as date_parser
+    return date_parser.parse(value)
+
+
+def usage_fingerprint(data):
+    """Reduce a usage payload to the values the widget renders"""
+    return tuple(
+        ((data.get(window) or {}).get('utilization'), (data.get(window) or {}).get('resets_at'))
+        for window in USAGE_WINDOWS
+    )
+
+
+def normalize_usage(data):
+    """Parse a usage payload once into per-window render state.
+
+    reset_deadline is a time.monotonic() deadline, so the per-second
+    countdown is a subtraction and ignores wall-clock jumps; reset_epoch is
+    the same moment as a Unix time, for storage. reset_error is set when
+    resets_at could not be parsed.
+    """
+    now = time.monotonic()
+    windows = {}
+    for name in USAGE_WINDOWS:
+        usage = data.get(name) or {}
+        window = {
+            'utilization': usage.get('utilization') or 0.0,
+            'resets_at': usage.get('resets_at'),
+            'reset_deadline': None,
+            'reset_epoch': None,
+            'reset_error': False,
+        }
+        if window['resets_at']:
+            try:
+                reset_time = parse_reset_time(window['resets_at'])
+                time_left = (reset_time - datetime.now(reset_time.tzinfo)).total_seconds()
+                window['reset_deadline'] = now + time_left
+                window['reset_epoch'] = reset_time.timestamp()
+            except Exception:
+                window['reset_error'] = True
+        windows[name] = window
+    return windows
+
+
+# Reset times closer than this (seconds) belong to the same usage period
+PERIOD_TOLERANCE = 60
+
+
+def same_reset_period(reset_a, reset_b):
+    """Whether two reset times (epochs or deadlines; None or NaN if unknown) are one usage period"""
+    unknown_a = reset_a is None or math.isnan(reset_a)
+    unknown_b = reset_b is None or math.isnan(reset_b)
+    if unknown_a or unknown_b:
+        return unknown_a and unknown_b
+    return abs(reset_a - reset_b) <= PERIOD_TOLERANCE
+
+
+class UsageFetchError(Exception):
+    """A failed fetch attempt, with what the retry scheduler needs to know"""
+
+    def __init__(self, message, status=None, retry_after=None, retryable=True):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.retryable = retryable
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds, or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryScheduler:
+    """Backoff state machine for failed fetches.
+
+    States are 'idle' (regular polling), 'backoff' (a retry is scheduled at
+    next_attempt_at) and 'exhausted' (gave up until the next regular poll).
+    The scheduler only computes delays; the polling loop does the waiting on
+    an event, so a retry can be cancelled at once and never holds a thread.
+    """
+
+    def __init__(self, max_retries=3, base_delay=2, max_delay=300, jitter=0.25):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.lock = threading.Lock()
+        self.state = 'idle'
+        self.attempt = 0
+        self.next_attempt_at = None  # time.time() of the scheduled retry
+
+    def record_success(self):
+        self.cancel()
+
+    def record_failure(self, retry_after=None, rate_limited=False):
+        """Schedule the next retry and return its delay, or None when out of retries"""
+        with self.lock:
+            if self.state != 'backoff':
+                self.attempt = 0
+            if self.attempt >= self.max_retries:
+                self.state = 'exhausted'
+                self.attempt = 0
+                self.next_attempt_at = None
+                return None
+
+            delay = self.base_delay * (2 ** self.attempt)
+            if rate_limited:
+                delay *= 2  # Back off harder when rate limited
+            if retry_after is not None:
+                delay = retry_after  # The server knows best
+            delay = min(delay, self.max_delay)
+            delay += random.uniform(0, delay * self.jitter)
+
+            self.attempt += 1
+            self.state = 'backoff'
+            self.next_attempt_at = time.time() + delay
+            return delay
+
+    def cancel(self):
+        """Drop any scheduled retry"""
+        with self.lock:
+            self.state = 'idle'
+            self.attempt = 0
+            self.next_attempt_at = None
+
+    def seconds_until_retry(self):
+        """Seconds until the scheduled retry, or None if none is scheduled"""
+        with self.lock:
+            if self.state != 'backoff':
+                return None
+            return max(0.0, self.next_attempt_at - time.time())
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker around the claude.ai API.
+
+    After failure_threshold consecutive failures the circuit opens and no
+    requests are allowed for the cool-down window. Then a single probe is let
+    through (half-open): success closes the circuit, failure reopens it with
+    a doubled cool-down, capped at max_cooldown.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=120, max_cooldown=900):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.cooldown = cooldown
+        self.opened_at = None  # time.monotonic() when the circuit last opened
+
+    def allow_request(self):
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = 'half_open'  # Let exactly one probe through
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half_open':
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self.open()
+            elif self.state == 'closed' and self.failures >= self.failure_threshold:
+                self.open()
+
+    def open(self):
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+
+    def seconds_until_probe(self):
+        """Seconds until the next probe is allowed, or None if the circuit isn't open"""
+        with self.lock:
+            if self.state != 'open':
+                return None
+            return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+
+class RateEstimator:
+    """Time-weighted exponential average of how fast a value changes.
+
+    A sample's weight grows with the time since the previous one, so a poll
+    2 s after the last barely moves the rate while one after 5 minutes
+    dominates it; half_life seconds of new samples halve the old rate's
+    weight. Each update is O(1).
+    """
+
+    def __init__(self, half_life):
+        self.half_life = half_life
+        self.rate = None  # units per second, None until two samples
+        self.last_sample = None  # (time.monotonic(), value)
+
+    def update(self, value, now=None):
+        """Feed one sample and return the smoothed rate (or None)"""
+        now = time.monotonic() if now is None else now
+        if self.last_sample:
+            last_time, last_value = self.last_sample
+            elapsed = now - last_time
+            if elapsed > 0:
+                sample = (value - last_value) / elapsed
+                if self.rate is None:
+                    self.rate = sample
+                else:
+                    self.rate += (1 - 0.5 ** (elapsed / self.half_life)) * (sample - self.rate)
+        self.last_sample = (now, value)
+        return self.rate
+
+    def restart(self, value, now=None):
+        """Forget the rate and start over from this sample"""
+        self.rate = None
+        self.last_sample = (time.monotonic() if now is None else now, value)
+
+
+class AdaptivePollInterval:
+    """Chooses the next poll interval from how five_hour utilization moves.
+
+    While utilization climbs, the interval is sized so that roughly four polls
+    land before the next notification threshold is crossed. Near a threshold
+    it polls at min_interval. When usage is flat or at 0% it backs off
+    gradually towards max_interval.
+    """
+
+    samples_per_threshold = 4
+    near_margin = 5  # percentage points below a threshold that count as "near"
+    backoff_factor = 1.5
+    velocity_half_life = 60  # seconds, see RateEstimator
+
+    def __init__(self, min_interval, max_interval):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.interval = min_interval
+        self.velocity_estimator = RateEstimator(self.velocity_half_life)
+
+    @property
+    def velocity(self):
+        """Utilization points per second, smoothed (0 until known)"""
+        return self.velocity_estimator.rate or 0.0
+
+    def update(self, utilization, thresholds):
+        """Feed a new utilization sample and return the next interval in seconds"""
+        last_sample = self.velocity_estimator.last_sample
+        if last_sample and utilization < last_sample[1]:
+            self.velocity_estimator.restart(utilization)  # Window reset
+        else:
+            self.velocity_estimator.update(utilization)
+
+        upcoming = [t for t in sorted(thresholds) + [100] if t > utilization]
+        headroom = upcoming[0] - utilization if upcoming else None
+
+        if headroom is not None and headroom <= self.near_margin:
+            interval = self.min_interval
+        elif utilization > 0 and headroom is not None and self.velocity > 1e-4:
+            interval = headroom / self.velocity / self.samples_per_threshold
+        else:
+            interval = self.interval * self.backoff_factor
+
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+        return self.interval
+
+
+class BurnRateForecaster:
+    """Projects when one usage window will reach 100% at the current pace.
+
+    The burn rate is a RateEstimator over utilization, so each update is
+    O(1) and half_life seconds of polls halve the weight of older pace. A
+    drop in utilization or a moved resets_at starts a new period and
+    discards the old rate.
+    """
+
+    def __init__(self, half_life):
+        self.burn_rate = RateEstimator(half_life)
+        self.reset_deadline = None
+        self.forecast = None
+
+    def update(self, utilization, reset_deadline, now=None):
+        """Feed one poll's utilization and return the new forecast (or None)"""
+        now = time.monotonic() if now is None else now
+        last_sample = self.burn_rate.last_sample
+        if (last_sample and utilization >= last_sample[1]
+                and same_reset_period(reset_deadline, self.reset_deadline)):
+            self.burn_rate.update(utilization, now)
+        else:
+            self.burn_rate.restart(utilization, now)  # New period (or first sample) - no pace yet
+        self.reset_deadline = reset_deadline
+        self.forecast = self.project(utilization, now)
+        return self.forecast
+
+    def project(self, utilization, now):
+        """Forecast dict with a time.monotonic() limit_deadline, or None when not climbing"""
+        rate = self.burn_rate.rate
+        if rate is None or rate <= 1e-6 or utilization >= 100:
+            return None
+        limit_deadline = now + (100 - utilization) / rate
+        return {
+            'rate_per_hour': rate * 3600,
+            'limit_deadline': limit_deadline,
+            'before_reset': self.reset_deadline is None or limit_deadline < self.reset_deadline,
+        }
+
+
+class AsyncFetchEngine:
+    """Runs batches of API requests concurrently on a dedicated asyncio loop.
+
+    The cloudscraper session is synchronous, so each request runs in the
+    loop's thread pool; the loop fans the batch out, applies a per-request
+    timeout and an overall deadline, and returns all results together.
+    """
+
+    def __init__(self, max_workers=8):
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='claude-fetch')
+        )
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    async def gather(self, calls, request_timeout, deadline):
+        loop = asyncio.get_running_loop()
+        tasks = [
+            asyncio.wait_for(loop.run_in_executor(None, call), request_timeout)
+            for call in calls
+        ]
+        return await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), deadline)
+
+    def map(self, calls, request_timeout=15, deadline=30):
+        """Run blocking calls concurrently; returns results or exceptions in call order.
+
+        Raises asyncio.TimeoutError if the whole batch misses the deadline.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self.gather(calls, request_timeout, deadline), self.loop
+        )
+        return future.result()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class FetchCoordinator:
+    """Single-flight wrapper around the usage fetch.
+
+    At most one fetch runs at a time. Callers arriving while it is in flight
+    wait for it and share its result, and successful results younger than
+    min_spacing seconds are handed out again instead of hitting the network.
+    A failed result is never reused: the caller waits out the spacing and
+    then fetches for real.
+    """
+
+    def __init__(self, fetch_fn, min_spacing=5):
+        self.fetch_fn = fetch_fn
+        self.min_spacing = min_spacing
+        self.lock = threading.Lock()
+        self.in_flight = None  # threading.Event set when the running fetch ends
+        self.last_result = None
+        self.last_fetch_time = None  # time.monotonic() of the last network fetch
+
+    def fetch(self):
+        """Return (result, fresh); fresh is False when result is a reused earlier one"""
+        while True:
+            with self.lock:
+                done = self.in_flight
+                if done is None:
+                    wait = self.remaining()
+                    if wait <= 0:
+                        self.in_flight = threading.Event()
+                        break
+                    if self.last_result is not None:
+                        return self.last_result, False
+
+            if done is not None:
+                # Join the fetch that is already running
+                done.wait()
+                return self.last_result, True
+            time.sleep(wait)  # Last attempt failed - fetch again once spacing allows
+
+        result = None
+        try:
+            result = self.fetch_fn()
+        finally:
+            with self.lock:
+                self.last_result = result
+                self.last_fetch_time = time.monotonic()
+                done, self.in_flight = self.in_flight, None
+            done.set()
+        return result, True
+
+    def spacing_remaining(self):
+        """Seconds until the next network fetch is allowed"""
+        with self.lock:
+            return self.remaining()
+
+    def remaining(self):
+        if self.last_fetch_time is None:
+            return 0
+        return max(0.0, self.min_spacing - (time.monotonic() - self.last_fetch_time))
+
+
+class UsageHistoryStore:
+    """Append-only usage history in SQLite (WAL mode).
+
+    record() only queues rows; a writer thread inserts whatever is queued
+    in one transaction every flush_interval seconds, so fetching and
+    rendering never wait for the disk. Rows are indexed by (window,
+    fetched_at) so range queries stay fast as the table grows. A failed
+    write is logged and retried at the next flush with at most
+    max_pending rows held back.
+    """
+
+    SCHEMA = (
+        '''CREATE TABLE IF NOT EXISTS usage_samples (
+            id INTEGER PRIMARY KEY,
+            fetched_at REAL NOT NULL,
+            window TEXT NOT NULL,
+            org_id TEXT,
+            utilization REAL,
+            resets_at TEXT,
+            latency_ms REAL
+        )''',
+        '''CREATE INDEX IF NOT EXISTS usage_samples_window_time
+            ON usage_samples (window, fetched_at)''',
+    )
+
+    max_pending = 10000  # Rows kept while writes fail; older ones are dropped
+
+    def __init__(self, path, flush_interval=5):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.rows = queue.SimpleQueue()
+        self.pending = []  # Rows taken off the queue but not written yet
+        self.closing = threading.Event()
+        # Opened here so an unusable database raises sqlite3.Error to the caller
+        self.connection = self.connect()
+        self.thread = threading.Thread(target=self.run, name='usage-history', daemon=True)
+        self.thread.start()
+
+    def record(self, data, org_id=None, latency=None, fetched_at=None):
+        """Queue one row per usage window (never blocks)"""
+        fetched_at = fetched_at or time.time()
+        latency_ms = latency * 1000 if latency is not None else None
+        for window in USAGE_WINDOWS:
+            usage = data.get(window) or {}
+            self.rows.put((fetched_at, window, org_id, usage.get('utilization'), usage.get('resets_at'), latency_ms))
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')  # Durable enough for a history log
+            with connection:
+                for statement in self.SCHEMA:
+                    connection.execute(statement)
+        except sqlite3.Error:
+            connection.close()
+            raise
+        return connection
+
+    def run(self):
+        try:
+            while not self.closing.wait(self.flush_interval):
+                self.flush()
+            self.flush()
+        finally:
+            self.connection.close()
+
+    def flush(self):
+        while True:
+            try:
+                self.pending.append(self.rows.get_nowait())
+            except queue.Empty:
+                break
+        if not self.pending:
+            return
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    '''INSERT INTO usage_samples
+                       (fetched_at, window, org_id, utilization, resets_at, latency_ms)
+                       VALUES (?, ?, ?, ?, ?, ?)''',
+                    self.pending
+                )
+        except sqlite3.Error as e:
+            # e.g. "database is locked" - try again next flush, keeping only the newest rows
+            del self.pending[:-self.max_pending]
+            print(f"Usage history: write failed ({e}), {len(self.pending)} rows pending",
+                  file=sys.stderr, flush=True)
+            return
+        self.pending = []
+
+    def close(self):
+        """Write out queued rows and stop the writer thread"""
+        self.closing.set()
+        self.thread.join(timeout=5)
+
+
+class FileLock:
+    """Exclusive lock shared between processes, held on a small side file.
+
+    A side file rather than the data file itself, so locking never
+    interferes with a mapped view on Windows.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'a+b')
+
+    def __enter__(self):
+        if os.name == 'nt':
+            self.file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10s; keep waiting
+        else:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if os.name == 'nt':
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+    def close(self):
+        self.file.close()
+
+
+class SampleRing:
+    """Fixed-size ring of usage samples in a memory-mapped file.
+
+    Each record is 24 bytes: fetch time (float64), window id (uint8),
+    utilization (float32) and reset time as an epoch (float64, NaN when
+    unknown). append() packs straight into the map, so memory stays
+    constant however long the app runs; records() and view() read the
+    mapped bytes without copying the buffer.
+
+    Several processes (widget, headless monitor) may share the file: the
+    record count lives only in the mapped header and every access takes
+    the lock file, and an existing ring is never truncated - it keeps the
+    capacity it was created with.
+    """
+
+    MAGIC = b'CUR1'
+    HEADER = struct.Struct('<4sIQ')  # magic, capacity, records written so far
+    RECORD = struct.Struct('<dB3xfd')
+    WINDOW_IDS = {window: index for index, window in enumerate(USAGE_WINDOWS)}
+
+    def __init__(self, path, capacity=20160):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.file_lock = FileLock(self.path.with_name(self.path.name + '.lock'))
+
+        with self.file_lock:
+            self.file = open(self.path, 'r+b' if self.path.exists() else 'w+b')
+            header = self.file.read(self.HEADER.size)
+            size = os.fstat(self.file.fileno()).st_size
+            if (len(header) == self.HEADER.size
+                    and self.HEADER.unpack(header)[0] == self.MAGIC
+                    and size == self.HEADER.size + self.HEADER.unpack(header)[1] * self.RECORD.size):
+                # Existing ring, possibly mapped by another process: adopt its capacity
+                capacity = self.HEADER.unpack(header)[1]
+            else:
+                # New or unreadable file - start empty
+                size = self.HEADER.size + capacity * self.RECORD.size
+                self.file.seek(0)
+                self.file.truncate(0)
+                self.file.write(self.HEADER.pack(self.MAGIC, capacity, 0))
+                self.file.truncate(size)
+                self.file.flush()
+            self.capacity = capacity
+            self.map = mmap.mmap(self.file.fileno(), size)
+
+    @property
+    def count(self):
+        """Records written so far by any process"""
+        return self.HEADER.unpack_from(self.map, 0)[2]
+
+    def append(self, window, utilization, reset_epoch=math.nan, timestamp=None):
+        timestamp = timestamp or time.time()
+        with self.lock, self.file_lock:
+            if self.map.closed:
+                return
+            count = self.count
+            offset = self.HEADER.size + (count % self.capacity) * self.RECORD.size
+            self.RECORD.pack_into(self.map, offset, timestamp, self.WINDOW_IDS[window], utilization, reset_epoch)
+            self.HEADER.pack_into(self.map, 0, self.MAGIC, self.capacity, count + 1)
+
+    def append_usage(self, windows, timestamp=None):
+        """Append one record per window of a normalize_usage() result"""
+        timestamp = timestamp or time.time()
+        for name, window in windows.items():
+            reset_epoch = window['reset_epoch'] if window['reset_epoch'] is not None else math.nan
+            self.append(name, window['utilization'], reset_epoch, timestamp)
+
+    def view(self):
+        """Zero-copy view of the record area (slot order, not time order)"""
+        return memoryview(self.map)[self.HEADER.size:]
+
+    def records(self, newest_first=False):
+        """Yield (timestamp, window, utilization, reset_epoch) in time order.
+
+        Each record is unpacked under the locks so a concurrent append can't
+        tear it; slots overwritten since the iteration started are skipped.
+        """
+        with self.lock:
+            if self.map.closed:
+                return
+            count = self.count
+        filled = min(count, self.capacity)
+        start = count - filled
+        for index in range(filled):
+            position = count - 1 - index if newest_first else start + index
+            with self.lock, self.file_lock:
+                if self.map.closed or position < self.count - self.capacity:
+                    continue
+                offset = self.HEADER.size + (position % self.capacity) * self.RECORD.size
+                timestamp, window_id, utilization, reset_epoch = self.RECORD.unpack_from(self.map, offset)
+            yield timestamp, USAGE_WINDOWS[window_id], utilization, reset_epoch
+
+    def since(self, count, limit=None):
+        """Return (records appended after the first count, in time order; the new count).
+
+        Cursor for readers that only want what is new: pass the returned
+        count back next time. limit caps how many of the newest are read.
+        """
+        with self.lock, self.file_lock:
+            if self.map.closed:
+                return [], count
+            current = self.count
+            new = min(current - count, self.capacity)
+            if limit is not None:
+                new = min(new, limit)
+            if new <= 0:
+                return [], current
+            records = []
+            for position in range(current - new, current):
+                offset = self.HEADER.size + (position % self.capacity) * self.RECORD.size
+                timestamp, window_id, utilization, reset_epoch = self.RECORD.unpack_from(self.map, offset)
+                records.append((timestamp, USAGE_WINDOWS[window_id], utilization, reset_epoch))
+            return records, current
+
+    def latest(self, window):
+        """Newest (timestamp, utilization, reset_epoch) for window, or None"""
+        for timestamp, name, utilization, reset_epoch in self.records(newest_first=True):
+            if name == window:
+                return timestamp, utilization, reset_epoch
+        return None
+
+    def utilization_before(self, window, timestamp):
+        """Utilization of the newest sample taken before timestamp in the same reset period, else 0"""
+        current_reset = None
+        for sample_time, name, utilization, reset_epoch in self.records(newest_first=True):
+            if name != window:
+                continue
+            if sample_time >= timestamp:
+                current_reset = reset_epoch
+                continue
+            if current_reset is not None and not same_reset_period(current_reset, reset_epoch):
+                return 0.0  # The window has reset since
+            return utilization
+        return 0.0
+
+    def close(self):
+        with self.lock:
+            if not self.map.closed:
+                self.map.flush()
+                self.map.close()
+                self.file.close()
+                self.file_lock.close()
+
+
+def atomic_write(path, text):
+    """Replace path with text so readers see either the old or the new file, never a partial one"""
+    path = Path(path)
+    # Unique temp file in the same directory, so processes sharing it never collide
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ConfigWriter:
+    """Atomic, debounced writer for config.json.
+
+    save() serializes the config right away and starts a short timer if
+    none is pending; saves arriving before it fires only replace the
+    snapshot, so a burst of changes becomes one write. Writes from any
+    thread are serialized, and flush() writes immediately (used on exit).
+    A failed write is logged and stays pending; it is retried after
+    retry_delay seconds unless a newer save replaces it first.
+    """
+
+    retry_delay = 5
+
+    def __init__(self, path, delay=0.5):
+        self.path = Path(path)
+        self.delay = delay
+        self.lock = threading.Lock()  # Guards pending/timer
+        self.write_lock = threading.Lock()  # One writer on disk at a time
+        self.pending = None
+        self.timer = None
+
+    def save(self, config):
+        snapshot = json.dumps(config, indent=2)
+        with self.lock:
+            self.pending = snapshot
+            if self.timer is None:
+                # Not a daemon thread, so a pending write still lands at exit
+                self.timer = threading.Timer(self.delay, self.flush)
+                self.timer.start()
+
+    def flush(self):
+        """Write the pending snapshot now; returns False if the write failed"""
+        with self.write_lock:
+            with self.lock:
+                if self.timer:
+                    self.timer.cancel()
+                    self.timer = None
+                snapshot, self.pending = self.pending, None
+            if snapshot is None:
+                return True
+            try:
+                atomic_write(self.path, snapshot)
+            except OSError as e:
+                # e.g. a virus scanner holding the file on Windows, or a full disk
+                print(f"Could not save {self.path.name}: {e}", file=sys.stderr, flush=True)
+                with self.lock:
+                    if self.pending is None:
+                        self.pending = snapshot
+                    if self.timer is None:
+                        # Daemon, so a write that keeps failing can't hold the process open
+                        self.timer = threading.Timer(self.retry_delay, self.flush)
+                        self.timer.daemon = True
+                        self.timer.start()
+                return False
+            return True
+
+
+def default_app_data_dir():
+    """%APPDATA%\\ClaudeUsageBar on Windows, $XDG_CONFIG_HOME (or ~/.config)/ClaudeUsageBar elsewhere"""
+    base = os.getenv('APPDATA') or os.getenv('XDG_CONFIG_HOME') or Path.home() / '.config'
+    return Path(base) / 'ClaudeUsageBar'
+
+
+class UsageMonitor:
+    """Config, session and the fetch/poll cycle, without any UI.
+
+    Subclasses decide what happens with the results by overriding the
+    hooks: post_api_status(), on_auth_expired(), on_sample(), on_forecast()
+    and on_usage_changed(). All hooks run on the polling thread.
+    """
+
+    def __init__(self, app_data_dir=None):
+        # Paths
+        self.app_data_dir = Path(app_data_dir) if app_data_dir else default_app_data_dir()
+        self.app_data_dir.mkdir(parents=True, exist_ok=True)
+        self.config_file = self.app_data_dir / 'config.json'
+
+        # Load config
+        self.config = self.load_config()
+        self.config_lock = threading.RLock()  # Held for multi-key updates and while serializing
+        self.config_writer = ConfigWriter(self.config_file)
+
+        # Polling state (owned by the polling thread)
+        self.usage_fingerprint = None  # See usage_fingerprint()
+        self.fetched_windows = None  # normalize_usage() of the latest changed payload
+        self.parsed_usage = (None, None)  # (usage_fingerprint(), normalize_usage()) of the latest fetch
+        self.fetch_error = None  # Message of the last failed fetch
+        self.polling_active = True
+        self.retry_scheduler = RetryScheduler()
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=self.config.get('circuit_failure_threshold', 5),
+            cooldown=self.config.get('circuit_cooldown', 120)
+        )
+        self.sessions = {}  # thread ident -> Transport, see get_session()
+        self.session_lock = threading.Lock()
+        self.fetch_engine = AsyncFetchEngine(max_workers=max(self.config.get('fetch_workers', 4), 1))
+        self.org_usage = {}  # org uuid -> {'name', 'usage'} from the latest batch
+        self.fetch_coordinator = FetchCoordinator(
+            self.fetch_usage_data,
+            min_spacing=self.config.get('min_fetch_spacing', 5)
+        )
+        self.poll_thread = None
+        self.adaptive_interval = AdaptivePollInterval(
+            min(max(self.config.get('adaptive_min_interval', 20), 10), 300),
+            min(max(self.config.get('adaptive_max_interval', 300), 10), 300)
+        )
+        self.poll_wakeup = threading.Event()  # Set to cut the current poll wait short
+        self.last_fetch_at = None  # time.time() of the last successful fetch
+        self.sample_ring = SampleRing(
+            self.app_data_dir / 'samples.ring',
+            capacity=self.config.get('sample_ring_capacity', 20160)
+        )
+        self.forecasters = {
+            'five_hour': BurnRateForecaster(self.config.get('forecast_half_life', 900)),
+            'seven_day': BurnRateForecaster(self.config.get('forecast_half_life_weekly', 21600)),
+        }
+        self.forecasts = {}  # window -> BurnRateForecaster.forecast of the latest sample
+        self.history_store = None
+        if self.config.get('history_enabled', True):
+            try:
+                self.history_store = UsageHistoryStore(self.app_data_dir / 'history.sqlite3')
+            except sqlite3.Error as e:
+                print(f"Usage history disabled: {e}", file=sys.stderr, flush=True)
+
+    def load_config(self):
+        default = {
+            'position': {'x': 20, 'y': 80},
+            'opacity': 0.9,
+            'session_key': None,
+            'orgs': None,  # Cached [{'uuid', 'name'}], cleared on account change
+            'org_id': None,  # Org shown in the widget
+            'poll_interval': 60,
+            'adaptive_polling': False,  # Poll faster while usage climbs, slower when idle
+            'adaptive_min_interval': 20,
+            'adaptive_max_interval': 300,
+            'min_fetch_spacing': 5,  # seconds between real network fetches
+            'api_base_url': DEFAULT_API_BASE_URL,
+            'transport': 'cloudscraper',  # 'cloudscraper' or 'requests' (see TRANSPORTS)
+            'request_timeout': 15,  # seconds per API request
+            'fetch_deadline': 30,  # seconds for a whole multi-org batch
+            'fetch_workers': 4,  # concurrent API requests, each worker keeps its own session
+            'circuit_failure_threshold': 5,  # consecutive failures before pausing
+            'circuit_cooldown': 120,  # seconds to pause before probing again
+            'history_enabled': True,  # Log every fetch to history.sqlite3
+            'sample_ring_capacity': 20160,  # Records in samples.ring (two per fetch); applies when the file is created
+            'forecast_half_life': 900,  # seconds; how fast the 5-hour burn rate forgets old pace
+            'forecast_half_life_weekly': 21600,
+            # New features
+            'minimize_to_tray': False,
+            'notification_thresholds': [80, 95, 99, 100],
+            'notification_cooldown': 300,  # seconds
+            'compact_mode': False,
+            'snap_mode': 'off',  # 'off', 'edge', 'taskbar'
+            'renderer': 'widgets',  # 'widgets' or 'canvas' (applied at startup)
+            'sparkline_samples': 60,  # Polls shown in the trend line under each bar
+            'auto_refresh_session': False
+        }
+        
+        if self.config_file.exists():
+            try:
+                with open(self.config_file, 'r') as f:
+                    loaded = json.load(f)
+                    return {**default, **loaded}
+            except:
+                pass
+        
+        return default
+    
+    def save_config(self):
+        """Schedule an atomic write of the config (see ConfigWriter)"""
+        with self.config_lock:
+            self.config_writer.save(self.config)
+
+    def get_session(self):
+        """Return the calling thread's API transport, rebuilt only if cookies or endpoint changed.
+
+        Neither cloudscraper nor requests sessions are thread-safe (cookie
+        jar, challenge state), so every API request runs on a fetch_engine
+        worker and each worker keeps its own long-lived transport. Workers
+        are only started when a batch needs them, so a single-org account
+        uses one session; at most fetch_workers sessions (each with its own
+        TLS connection and Cloudflare clearance) exist at once.
+        """
+        cookie_string = self.config.get('cookie_string') or f'sessionKey={self.config["session_key"]}'
+        transport_class = TRANSPORTS.get(self.config.get('transport'), CloudscraperTransport)
+        base_url = (self.config.get('api_base_url') or DEFAULT_API_BASE_URL).rstrip('/')
+        thread_id = threading.get_ident()
+        with self.session_lock:
+            session = self.sessions.get(thread_id)
+            if (session is None
+                    or type(session) is not transport_class
+                    or session.base_url != base_url
+                    or session.cookie_string != cookie_string):
+                if session:
+                    session.close()
+                session = self.sessions[thread_id] = transport_class(cookie_string, base_url)
+            return session
+
+    def invalidate_session(self):
+        """Drop every thread's session so the next requests build fresh ones"""
+        with self.session_lock:
+            sessions, self.sessions = self.sessions, {}
+        for session in sessions.values():
+            session.close()
+
+    def clear_session(self):
+        """Forget the login (session, cookies, org cache) and drop the transports"""
+        with self.config_lock:
+            for key in ('session_key', 'cookie_string', 'orgs', 'org_id'):
+                self.config[key] = None
+            self.save_config()
+        self.invalidate_session()
+
+    def resolve_orgs(self):
+        """Look up the account's organizations and cache them in config.
+
+        Returns (orgs, response); orgs is a list of {'uuid', 'name'} dicts and
+        is empty if the lookup failed. A failed lookup (e.g. a Cloudflare 403)
+        leaves the cached orgs and org_id untouched.
+        """
+        response = self.request_on_engine('/api/organizations')
+        if response.status_code != 200:
+            return [], response
+        orgs = [
+            {'uuid': org['uuid'], 'name': org.get('name') or org['uuid'][:8]}
+            for org in response.json() or []
+            if org.get('uuid')
+        ]
+        if not orgs:
+            return [], response
+
+        with self.config_lock:
+            if orgs != self.config.get('orgs'):
+                self.config['orgs'] = orgs
+                self.config['org_id'] = self.primary_org_id(orgs)
+                self.save_config()
+        return orgs, response
+
+    def primary_org_id(self, orgs):
+        """The org shown in the widget: the configured one if still present, else the first"""
+        uuids = [org['uuid'] for org in orgs]
+        if self.config.get('org_id') in uuids:
+            return self.config['org_id']
+        return uuids[0] if uuids else None
+
+    def primary_org_index(self, orgs):
+        primary_id = self.primary_org_id(orgs)
+        return next(i for i, org in enumerate(orgs) if org['uuid'] == primary_id)
+
+    def request_usage_batch(self, orgs):
+        """Fetch usage for all orgs at once; returns responses or exceptions in org order"""
+        timeout = self.request_timeout()
+        calls = [
+            lambda org_id=org['uuid']: self.get_session().get(
+                f'/api/organizations/{org_id}/usage',
+                timeout=timeout
+            )
+            for org in orgs
+        ]
+        return self.fetch_engine.map(
+            calls,
+            request_timeout=timeout,
+            deadline=self.config.get('fetch_deadline', 30)
+        )
+
+    def request_on_engine(self, path):
+        """One API GET on a fetch_engine worker (and its session); raises the request's error"""
+        timeout = self.request_timeout()
+        response, = self.fetch_engine.map(
+            [lambda: self.get_session().get(path, timeout=timeout)],
+            request_timeout=timeout,
+            deadline=self.config.get('fetch_deadline', 30)
+        )
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+    def fallback_org_index(self, orgs, responses, primary_index):
+        """Switch the widget to an org with usage when the primary one has none (404)"""
+        if getattr(responses[primary_index], 'status_code', None) != 404:
+            return primary_index
+        for index, response in enumerate(responses):
+            if getattr(response, 'status_code', None) == 200:
+                with self.config_lock:
+                    self.config['org_id'] = orgs[index]['uuid']
+                    self.save_config()
+                return index
+        return primary_index
+
+    def request_timeout(self):
+        return self.config.get('request_timeout', 15)
+
+    def fetch_usage_data(self):
+        """Make one fetch attempt; failures are handed to the retry scheduler"""
+        if not self.circuit_breaker.allow_request():
+            # Circuit is open - don't touch the network until the cool-down ends
+            self.post_api_status('paused', self.fetch_error)
+            return None
+
+        started = time.monotonic()
+        try:
+            usage_data = self.request_usage_data()
+        except UsageFetchError as e:
+            error = str(e)
+            if e.retryable:
+                self.circuit_breaker.record_failure()
+            else:
+                self.circuit_breaker.record_success()  # Reachable, just not authorized
+
+            if self.circuit_breaker.state == 'open':
+                self.retry_scheduler.cancel()
+                status = 'paused'
+            elif e.status == 401:
+                self.retry_scheduler.cancel()
+                status = 'error'
+                self.on_auth_expired()
+            elif e.retryable and self.retry_scheduler.record_failure(e.retry_after, e.status == 429) is not None:
+                status = 'warning'
+            else:
+                status = 'error'
+                error = f'{e} - gave up after {self.retry_scheduler.max_retries} retries'
+            self.fetch_error = error
+            self.post_api_status(status, error)
+            return None
+
+        # Success!
+        self.circuit_breaker.record_success()
+        self.retry_scheduler.record_success()
+        self.fetch_error = None
+        self.last_fetch_at = time.time()
+        self.sample_ring.append_usage(self.parse_usage(usage_data), self.last_fetch_at)
+        if self.history_store:
+            self.history_store.record(
+                usage_data, self.config.get('org_id'), time.monotonic() - started, self.last_fetch_at
+            )
+        self.post_api_status('ok', None)
+        return usage_data
+
+    def request_usage_data(self):
+        """Request the usage payload once, raising UsageFetchError on failure.
+
+        Usage for every org the session can see is fetched concurrently; the
+        primary org's payload is returned and the whole batch is published to
+        self.org_usage.
+        """
+        if not self.config.get('session_key'):
+            raise UsageFetchError('No session key', retryable=False)
+
+        try:
+            # Steady state: the orgs are cached, so only the usage endpoints are hit
+            orgs = self.config.get('orgs') or []
+            resolved = False
+            if not orgs:
+                orgs, response = self.resolve_orgs()
+                resolved = True
+
+            if orgs:
+                responses = self.request_usage_batch(orgs)
+                primary_index = self.primary_org_index(orgs)
+
+                primary_status = getattr(responses[primary_index], 'status_code', None)
+                if not resolved and primary_status in (403, 404):
+                    # Cached org is gone or no longer ours - resolve again right away
+                    orgs, response = self.resolve_orgs()
+                    if orgs:
+                        responses = self.request_usage_batch(orgs)
+                        primary_index = self.primary_org_index(orgs)
+
+            if orgs:
+                primary_index = self.fallback_org_index(orgs, responses, primary_index)
+                response = responses[primary_index]
+                if isinstance(response, BaseException):
+                    raise response
+                if response.status_code == 200:
+                    return self.publish_org_usage(orgs, responses, primary_index)
+
+        except (requests.exceptions.Timeout, asyncio.TimeoutError):
+            raise UsageFetchError('Timeout')
+        except requests.exceptions.ConnectionError:
+            raise UsageFetchError('No connection')
+        except Exception as e:
+            raise UsageFetchError(str(e)[:30])
+
+        if response.status_code == 401:
+            self.invalidate_session()
+            raise UsageFetchError('Session expired (401)', status=401, retryable=False)
+
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            raise UsageFetchError('Rate limited (429)', status=429, retry_after=retry_after)
+
+        if response.status_code == 403:
+            # Cloudflare clearance or cookies went stale - rebuild before retrying
+            self.invalidate_session()
+
+        raise UsageFetchError(f'HTTP {response.status_code}', status=response.status_code)
+
+    def publish_org_usage(self, orgs, responses, primary_index):
+        """Store the batch of per-org usage and return the primary org's payload"""
+        org_usage = {}
+        dropped = []
+        for org, response in zip(orgs, responses):
+            status = getattr(response, 'status_code', None)
+            if status == 200:
+                org_usage[org['uuid']] = {'name': org['name'], 'usage': response.json()}
+            elif status == 404:
+                dropped.append(org)  # No usage for this org (e.g. API-only)
+            elif org['uuid'] in self.org_usage:
+                # Transient failure (403 from Cloudflare, timeout, ...) - keep last known
+                org_usage[org['uuid']] = self.org_usage[org['uuid']]
+
+        if dropped:
+            # Stop asking for orgs without usage until the next re-resolve
+            with self.config_lock:
+                self.config['orgs'] = [org for org in orgs if org not in dropped]
+                self.save_config()
+
+        # Replace the whole dict so the UI thread never sees a partial batch
+        self.org_usage = org_usage
+        return org_usage[orgs[primary_index]['uuid']]['usage']
+
+    def polling_loop(self):
+        """Background thread for polling API"""
+        while self.polling_active:
+            data, fresh = self.fetch_coordinator.fetch()
+            # Refresh requests that arrived during the fetch were served by it
+            self.poll_wakeup.clear()
+            if not self.polling_active:
+                break  # Stopped during the fetch (e.g. session expired) - don't wait out an interval
+            if data and fresh:
+                self.on_sample(data)
+                # Forecast first so on_usage_changed() sees this poll's projections
+                windows = self.parse_usage(data)
+                self.update_forecasts(windows)
+                self.publish_usage(data, windows)
+
+            delay = self.retry_scheduler.seconds_until_retry()
+            if delay is None:
+                delay = self.next_poll_interval(data, fresh)
+            probe_delay = self.circuit_breaker.seconds_until_probe()
+            if probe_delay is not None:
+                delay = probe_delay  # Circuit open - next fetch is the probe
+            self.poll_wakeup.wait(max(delay, self.fetch_coordinator.spacing_remaining()))
+
+    def publish_usage(self, data, windows=None):
+        """Pass a fetched payload on to on_usage_changed(), but only if it changed.
+
+        windows is data's parse_usage() result when the caller already has it.
+        """
+        fingerprint = usage_fingerprint(data)
+        if fingerprint == self.usage_fingerprint:
+            return  # Same numbers as last time - nothing to redraw
+
+        self.usage_fingerprint = fingerprint
+        self.fetched_windows = windows or self.parse_usage(data)
+        self.on_usage_changed(data, self.fetched_windows, self.last_fetch_at or time.time())
+
+    def parse_usage(self, data):
+        """normalize_usage() of data, parsed again only when its numbers changed"""
+        fingerprint = usage_fingerprint(data)
+        parsed_fingerprint, windows = self.parsed_usage
+        if fingerprint != parsed_fingerprint:
+            windows = normalize_usage(data)
+            self.parsed_usage = (fingerprint, windows)
+        return windows
+
+    def update_forecasts(self, windows):
+        """Feed every window's forecaster the parsed sample and hand the projections to on_forecast()"""
+        now = time.monotonic()
+        self.forecasts = {
+            name: forecaster.update(windows[name]['utilization'], windows[name]['reset_deadline'], now)
+            for name, forecaster in self.forecasters.items()
+        }
+        self.on_forecast(self.forecasts)
+
+    def next_poll_interval(self, data, fresh=True):
+        """Seconds until the next regular poll; only fresh data counts as a new sample"""
+        reset_delay = self.saturated_reset_delay(data)
+        if reset_delay is not None:
+            # Nothing can change before the reset - sleep through it
+            return reset_delay + RESET_GRACE_SECONDS
+
+        if not self.config.get('adaptive_polling', False):
+            return self.config['poll_interval']
+        if not data or not fresh:
+            return self.adaptive_interval.interval
+
+        utilization = (data.get('five_hour') or {}).get('utilization') or 0.0
+        thresholds = self.config.get('notification_thresholds', [80, 95, 99, 100])
+        return self.adaptive_interval.update(utilization, thresholds)
+
+    def saturated_reset_delay(self, data):
+        """Seconds until the earliest reset of a window pinned at 100%, or None"""
+        if not data or not self.fetched_windows:
+            return None
+
+        now = time.monotonic()
+        delays = [
+            window['reset_deadline'] - now
+            for window in self.fetched_windows.values()
+            if window['utilization'] >= 100
+            and window['reset_deadline'] is not None
+            and window['reset_deadline'] > now
+        ]
+        return min(delays) if delays else None
+
+    def start_polling(self):
+        """Start background polling thread"""
+        self.polling_active = True
+        if self.poll_thread and self.poll_thread.is_alive():
+            # Already polling (e.g. after a re-login) - just fetch now
+            self.request_refresh()
+            return
+
+        self.poll_thread = threading.Thread(target=self.polling_loop, daemon=True)
+        self.poll_thread.start()
+
+    def request_refresh(self):
+        """Fetch now and restart the poll timer (safe to call from any thread)"""
+        self.retry_scheduler.cancel()
+        self.poll_wakeup.set()
+
+    def stop(self):
+        """Stop polling and release the session and fetch loop"""
+        self.polling_active = False
+        self.poll_wakeup.set()
+        self.invalidate_session()
+        self.fetch_engine.stop()
+        self.config_writer.flush()
+        if self.history_store:
+            self.history_store.close()
+        self.sample_ring.close()
+
+    # Hooks for subclasses
+
+    def post_api_status(self, status, error):
+        """A fetch finished: status is 'ok', 'warning', 'error' or 'paused'"""
+
+    def on_auth_expired(self):
+        """The API answered 401; the session needs a new login"""
+
+    def on_sample(self, data):
+        """Every successful fetch, changed or not"""
+
+    def on_forecast(self, forecasts):
+        """New time-to-limit projections after every successful fetch"""
+
+    def on_usage_changed(self, data, windows, changed_at):
+        """A payload whose numbers differ from the previous one"""
+
+
+class HeadlessMonitor(UsageMonitor):
+    """Writes usage snapshots as JSON instead of drawing a widget.
+
+    With output set to a path the file is replaced by the latest snapshot
+    on every change; otherwise one JSON line per change goes to stdout.
+    """
+
+    def __init__(self, app_data_dir=None, output=None):
+        super().__init__(app_data_dir)
+        self.output = Path(output) if output else None
+        self.exit_code = 0
+
+    def snapshot(self, data, changed_at):
+        return {
+            'fetched_at': datetime.fromtimestamp(changed_at).astimezone().isoformat(),
+            'usage': {window: data.get(window) for window in USAGE_WINDOWS},
+            'orgs': {
+                org_id: {'name': org['name'], 'usage': {window: org['usage'].get(window) for window in USAGE_WINDOWS}}
+                for org_id, org in self.org_usage.items()
+            },
+            'forecast': {window: self.forecast_snapshot(self.forecasts.get(window)) for window in USAGE_WINDOWS},
+        }
+
+    def forecast_snapshot(self, forecast):
+        if not forecast:
+            return None
+        limit_at = time.time() + forecast['limit_deadline'] - time.monotonic()
+        return {
+            'rate_per_hour': round(forecast['rate_per_hour'], 2),
+            'limit_at': datetime.fromtimestamp(limit_at).astimezone().isoformat(),
+            'before_reset': forecast['before_reset'],
+        }
+
+    def write_snapshot(self, snapshot):
+        if self.output:
+            atomic_write(self.output, json.dumps(snapshot, indent=2))
+        else:
+            print(json.dumps(snapshot), flush=True)
+
+    def post_api_status(self, status, error):
+        if error:
+            print(f"API {status}: {error}", file=sys.stderr, flush=True)
+
+    def on_auth_expired(self):
+        print("Session expired - log in again with the desktop widget", file=sys.stderr, flush=True)
+        self.exit_code = 2
+        self.polling_active = False
+        self.poll_wakeup.set()
+
+    def on_usage_changed(self, data, windows, changed_at):
+        self.write_snapshot(self.snapshot(data, changed_at))
+
+    def run_once(self):
+        """Fetch one snapshot, retrying transient failures through the RetryScheduler"""
+        while True:
+            data, _ = self.fetch_coordinator.fetch()
+            if data:
+                self.publish_usage(data)
+                return self.exit_code
+
+            delay = self.retry_scheduler.seconds_until_retry()
+            if delay is None or self.exit_code or not self.polling_active:
+                break  # Out of retries, not worth retrying (e.g. 401), or stopped
+            self.poll_wakeup.wait(delay)
+
+        if not self.exit_code:
+            self.exit_code = 1
+        return self.exit_code
+
+    def run(self):
+        try:
+            self.polling_loop()
+        except KeyboardInterrupt:
+            pass
+        return self.exit_code
+
+    def handle_sigterm(self, signum, frame):
+        """systemd stop, timeout or kill: leave the loop so stop() flushes history and config"""
+        self.polling_active = False
+        self.poll_wakeup.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Poll Claude usage without a UI and write JSON snapshots.')
+    parser.add_argument('--once', action='store_true', help='fetch once, print the snapshot and exit')
+    parser.add_argument('--output', help='file to keep the latest snapshot in (default: JSON lines on stdout)')
+    parser.add_argument('--config-dir', help='directory holding config.json (default: the widget\'s)')
+    args = parser.parse_args()
+
+    monitor = HeadlessMonitor(app_data_dir=args.config_dir, output=args.output)
+    signal.signal(signal.SIGTERM, monitor.handle_sigterm)
+    if not monitor.config.get('session_key'):
+        print(f"No session key in {monitor.config_file} - log in with the desktop widget first",
+              file=sys.stderr)
+        return 2
+
+    try:
+        return monitor.run_once() if args.once else monitor.run()
+    finally:
+        monitor.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,14 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import json
-import os
-import requests
-from datetime import datetime
-from pathlib import Path
 import threading
 import time
 import sys
 import ctypes
+import math
+from datetime import datetime, timezone
+from collections import deque
+
+from claude_usage_core import USAGE_WINDOWS, UsageMonitor, normalize_usage
 
 # System Tray
 try:
@@ -25,41 +25,402 @@ try:
 except ImportError:
     NOTIFICATIONS_AVAILABLE = False
 
-class ClaudeUsageBar:
+# How often (ms) the main thread drains events posted by worker threads. While
+# nothing arrives the interval doubles up to the idle cap (the longer one while
+# hidden or collapsed); any handled event drops it back to UI_EVENT_INTERVAL.
+UI_EVENT_INTERVAL = 100
+UI_EVENT_IDLE_INTERVAL = 500
+UI_EVENT_SUSPENDED_INTERVAL = 1000
+
+# Main window sizes for the normal and compact layouts
+NORMAL_SIZE = '300x272'
+COMPACT_SIZE = '300x90'
+
+class WidgetCache:
+    """Remembers what each widget (or canvas item) shows and only pushes real changes to Tk.
+
+    Every config()/place() is a Tcl round trip that may trigger a redraw,
+    so unchanged options are dropped. applied and skipped count option
+    updates, to make the saving measurable.
+    """
+
+    def __init__(self):
+        self.values = {}  # (widget, method, option) -> last value pushed
+        self.applied = 0
+        self.skipped = 0
+
+    def config(self, widget, **options):
+        changed = self.diff(widget, 'config', options)
+        if changed:
+            widget.config(**changed)
+
+    def place(self, widget, **options):
+        changed = self.diff(widget, 'place', options)
+        if changed:
+            widget.place(**changed)
+
+    def itemconfig(self, canvas, item, **options):
+        changed = self.diff((canvas, item), 'itemconfig', options)
+        if changed:
+            canvas.itemconfig(item, **changed)
+
+    def coords(self, canvas, item, *coords):
+        if self.diff((canvas, item), 'coords', {'coords': coords}):
+            canvas.coords(item, *coords)
+
+    def diff(self, widget, method, options):
+        changed = {}
+        for option, value in options.items():
+            key = (widget, method, option)
+            if key in self.values and self.values[key] == value:
+                self.skipped += 1
+            else:
+                self.values[key] = value
+                changed[option] = value
+        self.applied += len(changed)
+        return changed
+
+
+# Bar colors per window; 70% and 90% switch to the warning colors
+BAR_COLORS = {'five_hour': '#CC785C', 'seven_day': '#8B6BB7'}
+
+
+# Section titles per window
+WINDOW_TITLES = {'five_hour': '5-Hour Limit', 'seven_day': 'Weekly Limit'}
+
+
+def usage_color(window, utilization):
+    if utilization >= 90:
+        return '#ff4444'
+    if utilization >= 70:
+        return '#ffaa44'
+    return BAR_COLORS[window]
+
+
+class CanvasUsagePanel:
+    """Usage area drawn on a single tk.Canvas (the 'canvas' renderer).
+
+    Titles, usage text, bars and countdowns are canvas items created once
+    and updated in place through coords()/itemconfig(), all dirty-checked
+    by the shared WidgetCache. Switching between normal and compact layout
+    moves and hides items instead of re-packing widgets. The width follows
+    the canvas (<Configure>); heights follow from the section geometry.
+    """
+
+    bar_height = 12
+    sparkline_height = 12
+    text_height = 16
+    reset_y = 68  # Normal layout: countdown offset within a section
+    section_spacing = 100  # Normal layout: distance between sections
+    row_spacing = 22  # Compact layout: distance between rows
+    compact_bar_x = 78  # Compact layout: bars start right of the percentage
+    sections = tuple(WINDOW_TITLES.items())
+
+    def __init__(self, parent, view, history_capacity):
+        self.view = view
+        self.canvas = tk.Canvas(
+            parent,
+            height=self.normal_height(),
+            bg='#1a1a1a',
+            highlightthickness=0,
+            bd=0
+        )
+        self.canvas.pack(fill='x')
+        self.width = self.canvas.winfo_reqwidth()
+        self.canvas.bind('<Configure>', self.on_configure)
+
+        self.items = {}
+        self.bars = {}  # window -> (x0, y0, x1, y1) of the bar background
+        self.fractions = {}
+        for window, title in self.sections:
+            self.items[window] = {
+                'title': self.canvas.create_text(
+                    0, 0, text=title, anchor='nw', font=('Segoe UI', 8, 'bold'), fill='#888888'),
+                'usage': self.canvas.create_text(
+                    0, 0, text="Loading...", anchor='nw', font=('Segoe UI', 9), fill='#cccccc'),
+                'bar_bg': self.canvas.create_rectangle(0, 0, 0, 0, fill='#2a2a2a', width=0),
+                'bar_fill': self.canvas.create_rectangle(0, 0, 0, 0, fill=BAR_COLORS[window], width=0),
+                'reset': self.canvas.create_text(
+                    0, 0, text="Resets in: --", anchor='nw', font=('Segoe UI', 7), fill='#666666'),
+            }
+            self.fractions[window] = 0.0
+        self.separator = self.canvas.create_line(0, 0, 0, 0, fill='#333333')
+        self.sparklines = {
+            window: Sparkline(self.canvas, history_capacity, BAR_COLORS[window])
+            for window, _ in self.sections
+        }
+
+        self.compact = False
+        self.layout()
+
+    def normal_height(self):
+        return (len(self.sections) - 1) * self.section_spacing + self.reset_y + self.text_height
+
+    def compact_height(self):
+        return (len(self.sections) - 1) * self.row_spacing + 4 + self.bar_height
+
+    def on_configure(self, event):
+        if event.width != self.width:
+            self.width = event.width
+            self.layout()
+
+    def set_compact(self, compact):
+        if compact != self.compact:
+            self.compact = compact
+            self.layout()
+
+    def layout(self):
+        """Position every item for the current mode"""
+        if self.compact:
+            # One row per window: percentage on the left, bar on the right
+            for row, (window, _) in enumerate(self.sections):
+                y = row * self.row_spacing
+                self.place_item(window, 'title', None)
+                self.place_item(window, 'usage', (0, y))
+                self.place_item(window, 'reset', None)
+                self.bars[window] = (self.compact_bar_x, y + 4, self.width, y + 4 + self.bar_height)
+                self.sparklines[window].set_visible(False)
+            self.view.itemconfig(self.canvas, self.separator, state='hidden')
+            height = self.compact_height()
+        else:
+            for index, (window, _) in enumerate(self.sections):
+                y = index * self.section_spacing
+                self.place_item(window, 'title', (0, y))
+                self.place_item(window, 'usage', (0, y + 16))
+                self.place_item(window, 'reset', (0, y + self.reset_y))
+                self.bars[window] = (0, y + 36, self.width, y + 36 + self.bar_height)
+                self.sparklines[window].place(0, y + 52, self.width, self.sparkline_height)
+                self.sparklines[window].set_visible(True)
+            separator_y = self.section_spacing - 10
+            self.view.coords(self.canvas, self.separator, 0, separator_y, self.width, separator_y)
+            self.view.itemconfig(self.canvas, self.separator, state='normal')
+            height = self.normal_height()
+
+        for window, _ in self.sections:
+            self.view.coords(self.canvas, self.items[window]['bar_bg'], *self.bars[window])
+            self.draw_fill(window)
+        self.canvas.config(height=height)
+
+    def place_item(self, window, name, position):
+        item = self.items[window][name]
+        if position is None:
+            self.view.itemconfig(self.canvas, item, state='hidden')
+        else:
+            self.view.coords(self.canvas, item, *position)
+            self.view.itemconfig(self.canvas, item, state='normal')
+
+    def draw_fill(self, window):
+        x0, y0, x1, y1 = self.bars[window]
+        fill_x = x0 + int((x1 - x0) * min(max(self.fractions[window], 0.0), 1.0))
+        self.view.coords(self.canvas, self.items[window]['bar_fill'], x0, y0, fill_x, y1)
+
+    def set_usage(self, window, text, fraction, color):
+        self.set_usage_text(window, text)
+        self.view.itemconfig(self.canvas, self.items[window]['bar_fill'], fill=color)
+        self.fractions[window] = fraction
+        self.draw_fill(window)
+
+    def set_usage_text(self, window, text):
+        self.view.itemconfig(self.canvas, self.items[window]['usage'], text=text)
+
+    def set_title(self, window, text):
+        self.view.itemconfig(self.canvas, self.items[window]['title'], text=text)
+
+    def set_reset(self, window, text, color):
+        self.view.itemconfig(self.canvas, self.items[window]['reset'], text=text, fill=color)
+
+
+class TrayIconImages:
+    """Tray icons showing utilization as a ring, drawn once and reused.
+
+    Utilization is rounded down to `step`-point buckets; each (bucket,
+    color) image is rendered with PIL only the first time it is needed
+    (prerender() fills the cache up front), so later updates are a dict
+    lookup and an image swap.
+    """
+
+    def __init__(self, size=64, step=5):
+        self.size = size
+        self.step = step
+        self.images = {}
+
+    def bucket(self, utilization):
+        utilization = min(max(utilization, 0.0), 100.0)
+        return int(utilization // self.step) * self.step
+
+    def get(self, bucket, color):
+        key = (bucket, color)
+        if key not in self.images:
+            self.images[key] = self.render(bucket, color)
+        return self.images[key]
+
+    def prerender(self, window):
+        for bucket in range(0, 101, self.step):
+            self.get(bucket, usage_color(window, bucket))
+
+    def render(self, bucket, color):
+        size = self.size
+        image = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        box = [4, 4, size - 4, size - 4]
+        draw.ellipse(box, fill='#3a3a3a')
+        if bucket >= 100:
+            draw.ellipse(box, fill=color)
+        elif bucket > 0:
+            draw.pieslice(box, -90, -90 + bucket * 3.6, fill=color)
+        hole = size * 0.3
+        draw.ellipse([hole, hole, size - hole, size - hole], fill='#1a1a1a')
+        return image
+
+
+class Sparkline:
+    """Trend line of recent utilization drawn into a region of a canvas.
+
+    Every sample gets one horizontal slot on a fixed 0-100% scale, so a new
+    sample adds a single line segment. Once all slots are used the line is
+    shifted left by one slot with one move() and the oldest segment is
+    deleted. The whole chart is only rebuilt on relayout.
+    """
+
+    def __init__(self, canvas, capacity, color):
+        self.canvas = canvas
+        self.capacity = max(capacity, 2)
+        self.color = color
+        self.tag = f'sparkline-{id(self)}'
+        self.values = deque(maxlen=self.capacity)
+        self.segments = deque()
+        self.region = None  # (x, y, width, height)
+        self.visible = True
+
+    def place(self, x, y, width, height):
+        if (x, y, width, height) != self.region:
+            self.region = (x, y, width, height)
+            self.redraw()
+
+    def set_visible(self, visible):
+        if visible != self.visible:
+            self.visible = visible
+            self.canvas.itemconfig(self.tag, state='normal' if visible else 'hidden')
+
+    def extend(self, values):
+        if len(values) >= self.capacity:
+            # Everything on screen is stale - start over
+            self.values.clear()
+            self.values.extend(values)
+            self.redraw()
+        else:
+            for value in values:
+                self.add(value)
+
+    def add(self, value):
+        previous = self.values[-1] if self.values else None
+        full = len(self.values) == self.capacity
+        self.values.append(value)
+        if self.region is None or previous is None:
+            return
+
+        if full:
+            # Scroll one slot left and drop the oldest segment
+            self.canvas.delete(self.segments.popleft())
+            self.canvas.move(self.tag, -self.slot_width(), 0)
+        self.draw_segment(len(self.values) - 1, previous, value)
+
+    def redraw(self):
+        self.canvas.delete(self.tag)
+        self.segments.clear()
+        if self.region is None:
+            return
+        values = list(self.values)
+        for index in range(1, len(values)):
+            self.draw_segment(index, values[index - 1], values[index])
+
+    def slot_width(self):
+        return self.region[2] / (self.capacity - 1)
+
+    def point(self, index, value):
+        x, y, width, height = self.region
+        value = min(max(value, 0.0), 100.0)
+        return x + index * self.slot_width(), y + height - 1 - value / 100 * (height - 1)
+
+    def draw_segment(self, index, previous, value):
+        self.segments.append(self.canvas.create_line(
+            *self.point(index - 1, previous),
+            *self.point(index, value),
+            fill=self.color,
+            tags=self.tag,
+            state='normal' if self.visible else 'hidden'
+        ))
+
+
+class UIEventQueue:
+    """Thread-safe mailbox from worker threads to the Tk main loop.
+
+    Workers post(kind, payload) and never touch widgets or UI state
+    directly. The main thread drains everything pending in one after()
+    tick; events of the same kind are coalesced so only the latest payload
+    is handled, e.g. a burst of status changes becomes a single repaint.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}  # kind -> latest payload, in posting order
+        self.posted = 0
+        self.handled = 0
+
+    def post(self, kind, payload=None):
+        with self.lock:
+            self.pending.pop(kind, None)  # Re-insert so the order follows the latest post
+            self.pending[kind] = payload
+            self.posted += 1
+
+    def drain(self):
+        """Take all pending events as a list of (kind, payload)"""
+        with self.lock:
+            events = list(self.pending.items())
+            self.pending.clear()
+            self.handled += len(events)
+        return events
+
+
+class ClaudeUsageBar(UsageMonitor):
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("Claude Usage")
         self.root.attributes('-topmost', True)
         self.root.overrideredirect(True)
         
-        # Paths
-        self.app_data_dir = Path(os.getenv('APPDATA')) / 'ClaudeUsageBar'
-        self.app_data_dir.mkdir(exist_ok=True)
-        self.config_file = self.app_data_dir / 'config.json'
-        
-        # Load config
-        self.config = self.load_config()
+        # Paths, config and the polling machinery
+        super().__init__()
         
         # State
         self.dragging = False
         self.drag_x = 0
         self.drag_y = 0
-        self.usage_data = None
-        self.polling_active = True
+        self.usage_windows = None  # normalize_usage() of usage_data
+        self.stale_since = None  # Fetch time of the cached payload shown until fresh data arrives
+        self.usage_forecasts = {}  # window -> BurnRateForecaster.forecast shown next to the reset label
+        self.ui_events = UIEventQueue()  # The only way worker threads reach the UI
+        self.ui_event_interval = UI_EVENT_INTERVAL  # ms until the next drain, see drain_ui_events()
+        self.sparkline_samples = max(self.config.get('sparkline_samples', 60), 2)
+        self.history_drawn = 0  # sample_ring.count already drawn into the sparklines
+        self.view = WidgetCache()  # Dirty-checked widget updates
+        self.countdown_job = None  # after() id of the countdown ticker
+        self.render_suspended = False  # True while hidden to tray or collapsed
+        self.render_pending = False  # A payload arrived while suspended
+        self.last_changed_at = None  # time.time() when the numbers last changed
         self.driver = None
         self.login_in_progress = False
         self.settings_window = None
         self.clickthrough_enabled = False
 
         # New feature states
-        self.api_status = 'unknown'  # 'ok', 'warning', 'error', 'unknown'
+        self.api_status = 'unknown'  # 'ok', 'warning', 'error', 'paused', 'unknown'
         self.last_api_error = None
-        self.retry_count = 0
         self.tray_icon = None
+        self.tray_images = None  # TrayIconImages, created with the tray icon
+        self.tray_icon_key = None  # (bucket, color) currently shown in the tray
         self.is_hidden = False
         self.notification_sent = {}  # Track sent notifications to avoid spam
-        self.last_five_hour_utilization = 0
-        self.last_weekly_utilization = 0
         self.snapped_edge = None  # Track which edge we're snapped to
         self.collapsed = False  # For edge snap collapse feature
         
@@ -75,41 +436,19 @@ class ClaudeUsageBar:
         if TRAY_AVAILABLE:
             self.create_tray_icon()
 
+        # Show the last known numbers right away; the first fetch replaces them
+        if self.config.get('session_key'):
+            self.show_cached_usage()
+
+        self.start_countdown_ticker()
+        self.drain_ui_events()
+
         # Check if we have auth token
         if not self.config.get('session_key'):
             self.root.after(500, self.show_login_dialog)
         else:
             self.start_polling()
         
-    def load_config(self):
-        default = {
-            'position': {'x': 20, 'y': 80},
-            'opacity': 0.9,
-            'session_key': None,
-            'poll_interval': 60,
-            # New features
-            'minimize_to_tray': False,
-            'notification_thresholds': [80, 95, 99, 100],
-            'notification_cooldown': 300,  # seconds
-            'compact_mode': False,
-            'snap_mode': 'off',  # 'off', 'edge', 'taskbar'
-            'auto_refresh_session': False
-        }
-        
-        if self.config_file.exists():
-            try:
-                with open(self.config_file, 'r') as f:
-                    loaded = json.load(f)
-                    return {**default, **loaded}
-            except:
-                pass
-        
-        return default
-    
-    def save_config(self):
-        with open(self.config_file, 'w') as f:
-            json.dump(self.config, f, indent=2)
-    
     def show_login_dialog(self):
         """Show login dialog"""
         self.login_dialog = tk.Toplevel(self.root)
@@ -214,21 +553,13 @@ class ClaudeUsageBar:
             try:
                 import undetected_chromedriver as uc
             except ImportError:
-                self.root.after(0, lambda: [
-                    self.status_label.config(
-                        text="Installing undetected-chromedriver...",
-                        fg='#ffaa44'
-                    )
-                ])
+                self.ui_events.post('login_status', ("Installing undetected-chromedriver...", '#ffaa44', False))
                 # Try to install it
                 import subprocess
                 subprocess.check_call([sys.executable, "-m", "pip", "install", "undetected-chromedriver"])
                 import undetected_chromedriver as uc
             
-            self.root.after(0, lambda: self.status_label.config(
-                text="Starting browser (bypassing Cloudflare)...",
-                fg='#ffaa44'
-            ))
+            self.ui_events.post('login_status', ("Starting browser (bypassing Cloudflare)...", '#ffaa44', False))
             
             # Create undetected Chrome driver
             options = uc.ChromeOptions()
@@ -237,21 +568,12 @@ class ClaudeUsageBar:
             try:
                 self.driver = uc.Chrome(options=options, use_subprocess=True)
             except Exception as e:
-                self.root.after(0, lambda: [
-                    self.status_label.config(
-                        text=f"Browser error: {str(e)[:40]}",
-                        fg='#ff4444'
-                    ),
-                    self.login_button.config(state='normal', text="Sign In")
-                ])
+                self.ui_events.post('login_status', (f"Browser error: {str(e)[:40]}", '#ff4444', True))
                 self.login_in_progress = False
                 return
             
             # Navigate to Claude
-            self.root.after(0, lambda: self.status_label.config(
-                text="Please log in to claude.ai in the browser...",
-                fg='#ffaa44'
-            ))
+            self.ui_events.post('login_status', ("Please log in to claude.ai in the browser...", '#ffaa44', False))
             
             self.driver.get('https://claude.ai')
             
@@ -300,32 +622,14 @@ class ClaudeUsageBar:
                     self.driver = None
             
             if session_key:
-                # Success! Save session key AND all cookies
-                self.config['session_key'] = session_key
-                
-                # Save all cookies as a cookie string
+                # Success! Hand session key AND all cookies to the main thread
+                cookie_string = None
                 if all_cookies:
                     cookie_string = '; '.join([f"{c['name']}={c['value']}" for c in all_cookies])
-                    self.config['cookie_string'] = cookie_string
-                
-                self.save_config()
-                
-                self.root.after(0, lambda: [
-                    self.status_label.config(text="✓ Login successful!", fg='#44ff44'),
-                ])
-                
-                # Close dialog and start polling
-                time.sleep(1)
-                self.root.after(0, lambda: [
-                    self.login_dialog.destroy() if hasattr(self, 'login_dialog') else None,
-                    self.start_polling()
-                ])
+                self.ui_events.post('login_success', (session_key, cookie_string))
             else:
                 # Timeout or closed
-                self.root.after(0, lambda: [
-                    self.status_label.config(text="Login cancelled or timeout. Try again.", fg='#ff4444'),
-                    self.login_button.config(state='normal', text="Sign In")
-                ])
+                self.ui_events.post('login_status', ("Login cancelled or timeout. Try again.", '#ff4444', True))
             
             self.login_in_progress = False
         
@@ -337,159 +641,67 @@ class ClaudeUsageBar:
                     pass
                 self.driver = None
             
-            self.root.after(0, lambda: [
-                self.status_label.config(text=f"Error: {str(e)[:40]}", fg='#ff4444'),
-                self.login_button.config(state='normal', text="Sign In")
-            ])
+            self.ui_events.post('login_status', (f"Error: {str(e)[:40]}", '#ff4444', True))
             self.login_in_progress = False
     
-    def fetch_usage_data(self, retry_attempt=0):
-        """Fetch usage data from Claude API with retry logic"""
-        if not self.config.get('session_key'):
-            self.api_status = 'error'
-            self.last_api_error = 'No session key'
-            return None
+    def show_login_status(self, status):
+        """Main thread: show login progress posted by automated_browser_login"""
+        text, color, enable_button = status
+        try:
+            self.status_label.config(text=text, fg=color)
+            if enable_button:
+                self.login_button.config(state='normal', text="Sign In")
+        except:
+            pass  # Dialog already closed
 
-        max_retries = 3
-        base_delay = 2  # seconds
+    def complete_login(self, credentials):
+        """Main thread: save the new session and start polling"""
+        session_key, cookie_string = credentials
+        with self.config_lock:
+            self.config['session_key'] = session_key
+            self.config['orgs'] = None  # May be a different account
+            self.config['org_id'] = None
 
-        try:
-            # Update status to warning if retrying
-            if retry_attempt > 0:
-                self.api_status = 'warning'
-                self.root.after(0, self.update_api_status_ui)
+            # Save all cookies as a cookie string
+            if cookie_string:
+                self.config['cookie_string'] = cookie_string
 
-            # Use cloudscraper to bypass Cloudflare
-            try:
-                import cloudscraper
-            except ImportError:
-                import subprocess
-                import sys
-                subprocess.check_call([sys.executable, "-m", "pip", "install", "cloudscraper"])
-                import cloudscraper
-
-            # Create a scraper that bypasses Cloudflare
-            scraper = cloudscraper.create_scraper(
-                browser={
-                    'browser': 'chrome',
-                    'platform': 'windows',
-                    'mobile': False
-                }
-            )
+            self.save_config()
+        self.show_login_status(("✓ Login successful!", '#44ff44', False))
 
-            # Use full cookie string if available
-            cookie_string = self.config.get('cookie_string', f'sessionKey={self.config["session_key"]}')
-
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'application/json',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Referer': 'https://claude.ai/chats',
-                'Sec-Fetch-Dest': 'empty',
-                'Sec-Fetch-Mode': 'cors',
-                'Sec-Fetch-Site': 'same-origin',
-                'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                'sec-ch-ua-mobile': '?0',
-                'sec-ch-ua-platform': '"Windows"',
-            }
+        # Close dialog and start polling
+        def finish():
+            if hasattr(self, 'login_dialog'):
+                try:
+                    self.login_dialog.destroy()
+                except:
+                    pass
+            self.start_polling()
 
-            # Set cookies
-            for cookie_pair in cookie_string.split('; '):
-                if '=' in cookie_pair:
-                    name, value = cookie_pair.split('=', 1)
-                    scraper.cookies.set(name, value, domain='claude.ai')
-
-            # Get organizations
-            response = scraper.get(
-                'https://claude.ai/api/organizations',
-                headers=headers,
-                timeout=15
-            )
+        self.root.after(1000, finish)
 
-            if response.status_code == 200:
-                orgs = response.json()
-
-                if orgs and len(orgs) > 0:
-                    org_id = orgs[0].get('uuid')
-
-                    # Get usage
-                    usage_response = scraper.get(
-                        f'https://claude.ai/api/organizations/{org_id}/usage',
-                        headers=headers,
-                        timeout=15
-                    )
-
-                    if usage_response.status_code == 200:
-                        usage_data = usage_response.json()
-                        # Success!
-                        self.api_status = 'ok'
-                        self.last_api_error = None
-                        self.retry_count = 0
-                        self.root.after(0, self.update_api_status_ui)
-                        return usage_data
-
-            elif response.status_code == 401:
-                self.api_status = 'error'
-                self.last_api_error = 'Session expired (401)'
-                self.root.after(0, self.update_api_status_ui)
-                self.root.after(0, self.handle_auth_error)
-                return None
-
-            elif response.status_code == 429:
-                self.api_status = 'warning'
-                self.last_api_error = 'Rate limited (429)'
-                # Rate limited - retry with longer delay
-                if retry_attempt < max_retries:
-                    delay = base_delay * (2 ** retry_attempt) * 2  # Double delay for rate limit
-                    time.sleep(delay)
-                    return self.fetch_usage_data(retry_attempt + 1)
-
-            # Other errors - retry
-            if retry_attempt < max_retries:
-                self.api_status = 'warning'
-                self.last_api_error = f'HTTP {response.status_code}'
-                delay = base_delay * (2 ** retry_attempt)
-                time.sleep(delay)
-                return self.fetch_usage_data(retry_attempt + 1)
-
-            self.api_status = 'error'
-            self.last_api_error = f'Failed after {max_retries} retries'
-            self.root.after(0, self.update_api_status_ui)
-            return None
-
-        except requests.exceptions.Timeout:
-            self.last_api_error = 'Timeout'
-            if retry_attempt < max_retries:
-                self.api_status = 'warning'
-                delay = base_delay * (2 ** retry_attempt)
-                time.sleep(delay)
-                return self.fetch_usage_data(retry_attempt + 1)
-            self.api_status = 'error'
-            self.root.after(0, self.update_api_status_ui)
-            return None
-
-        except requests.exceptions.ConnectionError:
-            self.last_api_error = 'No connection'
-            if retry_attempt < max_retries:
-                self.api_status = 'warning'
-                delay = base_delay * (2 ** retry_attempt)
-                time.sleep(delay)
-                return self.fetch_usage_data(retry_attempt + 1)
-            self.api_status = 'error'
-            self.root.after(0, self.update_api_status_ui)
-            return None
+    # UsageMonitor hooks (polling thread) - hand everything to the UI thread
+
+    def post_api_status(self, status, error):
+        self.ui_events.post('api_status', (status, error))
+
+    def on_auth_expired(self):
+        self.ui_events.post('auth_error')
+
+    def on_sample(self, data):
+        self.ui_events.post('history')
+
+    def on_forecast(self, forecasts):
+        self.ui_events.post('forecast', forecasts)
+
+    def on_usage_changed(self, data, windows, changed_at):
+        self.ui_events.post('usage', (data, windows, changed_at))
+
+    def apply_api_status(self, status):
+        """Main thread: store the latest API status and repaint the indicator"""
+        self.api_status, self.last_api_error = status
+        self.update_api_status_ui()
 
-        except Exception as e:
-            self.last_api_error = str(e)[:30]
-            if retry_attempt < max_retries:
-                self.api_status = 'warning'
-                delay = base_delay * (2 ** retry_attempt)
-                time.sleep(delay)
-                return self.fetch_usage_data(retry_attempt + 1)
-            self.api_status = 'error'
-            self.root.after(0, self.update_api_status_ui)
-            return None
-    
     def handle_auth_error(self):
         """Handle authentication errors with auto-refresh option"""
         # Send notification
@@ -503,45 +715,23 @@ class ClaudeUsageBar:
 
         if self.config.get('auto_refresh_session', False):
             # Auto-refresh: directly open browser
-            self.config['session_key'] = None
-            self.config['cookie_string'] = None
-            self.save_config()
+            self.clear_session()
             self.show_login_dialog()
         else:
             # Ask user
             if messagebox.askyesno("Session Expired",
                                    "Your session has expired. Would you like to log in again?"):
-                self.config['session_key'] = None
-                self.config['cookie_string'] = None
-                self.save_config()
+                self.clear_session()
                 self.show_login_dialog()
     
-    def polling_loop(self):
-        """Background thread for polling API"""
-        while self.polling_active:
-            data = self.fetch_usage_data()
-            if data:
-                self.usage_data = data
-                self.root.after(0, self.update_progress)
-            
-            time.sleep(self.config['poll_interval'])
-    
-    def start_polling(self):
-        """Start background polling thread"""
-        self.polling_active = True
-        poll_thread = threading.Thread(target=self.polling_loop, daemon=True)
-        poll_thread.start()
-        
-        # Initial fetch
-        def initial_fetch():
-            time.sleep(0.5)
-            data = self.fetch_usage_data()
-            if data:
-                self.usage_data = data
-                self.root.after(0, self.update_progress)
-        
-        threading.Thread(target=initial_fetch, daemon=True).start()
-    
+    def apply_usage(self, usage):
+        """Main thread: take over a changed payload and render it"""
+        _, self.usage_windows, self.last_changed_at = usage
+        self.stale_since = None
+        self.update_progress()
+        self.update_tray_icon()
+        self.check_usage_notifications()
+
     def format_time_remaining(self, time_left_seconds):
         """Format time remaining in a clear, readable way"""
         if time_left_seconds <= 0:
@@ -559,6 +749,16 @@ class ClaudeUsageBar:
         else:
             return f"{seconds}s"
     
+    def format_age(self, age_seconds):
+        """Format how long ago something happened"""
+        if age_seconds < 60:
+            return "just now"
+        hours = int(age_seconds // 3600)
+        minutes = int((age_seconds % 3600) // 60)
+        if hours > 0:
+            return f"{hours}h {minutes}m ago"
+        return f"{minutes}m ago"
+
     def setup_ui(self):
         self.main_frame = tk.Frame(
             self.root,
@@ -691,10 +891,24 @@ class ClaudeUsageBar:
         self.content_frame = tk.Frame(self.main_frame, bg='#1a1a1a')
         self.content_frame.pack(fill='x', padx=8, pady=8)
 
+        # Usage area: one canvas, or the classic stack of labels and frames
+        self.usage_canvas = None
+        if self.config.get('renderer') == 'canvas':
+            self.usage_canvas = CanvasUsagePanel(self.content_frame, self.view, self.sparkline_samples)
+            self.sparklines = self.usage_canvas.sparklines
+        else:
+            self.setup_usage_widgets()
+
+        # Set opacity
+        self.root.attributes('-alpha', self.config['opacity'])
+        self.root.geometry(NORMAL_SIZE)
+
+    def setup_usage_widgets(self):
+        """Build the usage area from Labels and Frames (the 'widgets' renderer)"""
         # 5-Hour Usage section
         self.five_hour_title = tk.Label(
             self.content_frame,
-            text="5-Hour Limit",
+            text=WINDOW_TITLES['five_hour'],
             font=('Segoe UI', 8, 'bold'),
             fg='#888888',
             bg='#1a1a1a',
@@ -718,7 +932,9 @@ class ClaudeUsageBar:
         self.five_hour_progress_bg.pack_propagate(False)
 
         self.five_hour_progress_fill = tk.Frame(self.five_hour_progress_bg, bg='#CC785C', height=12)
-        self.five_hour_progress_fill.place(x=0, y=0, relheight=1, width=0)
+        self.five_hour_progress_fill.place(x=0, y=0, relheight=1, relwidth=0)
+
+        self.five_hour_sparkline_canvas = self.create_sparkline_canvas()
         
         self.five_hour_reset_label = tk.Label(
             self.content_frame,
@@ -737,7 +953,7 @@ class ClaudeUsageBar:
         # Weekly Usage section
         self.weekly_title = tk.Label(
             self.content_frame,
-            text="Weekly Limit",
+            text=WINDOW_TITLES['seven_day'],
             font=('Segoe UI', 8, 'bold'),
             fg='#888888',
             bg='#1a1a1a',
@@ -761,7 +977,9 @@ class ClaudeUsageBar:
         self.weekly_progress_bg.pack_propagate(False)
 
         self.weekly_progress_fill = tk.Frame(self.weekly_progress_bg, bg='#8B6BB7', height=12)
-        self.weekly_progress_fill.place(x=0, y=0, relheight=1, width=0)
+        self.weekly_progress_fill.place(x=0, y=0, relheight=1, relwidth=0)
+
+        self.weekly_sparkline_canvas = self.create_sparkline_canvas()
         
         self.weekly_reset_label = tk.Label(
             self.content_frame,
@@ -773,9 +991,26 @@ class ClaudeUsageBar:
         )
         self.weekly_reset_label.pack(fill='x')
         
-        # Set opacity
-        self.root.attributes('-alpha', self.config['opacity'])
-        self.root.geometry('300x240')
+
+        # window -> (usage label, progress fill, reset label)
+        self.usage_widgets = {
+            'five_hour': (self.five_hour_usage_label, self.five_hour_progress_fill, self.five_hour_reset_label),
+            'seven_day': (self.weekly_usage_label, self.weekly_progress_fill, self.weekly_reset_label),
+        }
+        self.title_widgets = {'five_hour': self.five_hour_title, 'seven_day': self.weekly_title}
+        self.sparklines = {
+            'five_hour': Sparkline(self.five_hour_sparkline_canvas, self.sparkline_samples, BAR_COLORS['five_hour']),
+            'seven_day': Sparkline(self.weekly_sparkline_canvas, self.sparkline_samples, BAR_COLORS['seven_day']),
+        }
+        for sparkline in self.sparklines.values():
+            # Follow the canvas width instead of assuming one
+            sparkline.canvas.bind('<Configure>', lambda event, sparkline=sparkline: sparkline.place(0, 1, event.width, 12))
+            sparkline.place(0, 1, sparkline.canvas.winfo_reqwidth(), 12)
+
+    def create_sparkline_canvas(self):
+        canvas = tk.Canvas(self.content_frame, bg='#1a1a1a', height=14, highlightthickness=0, bd=0)
+        canvas.pack(fill='x', pady=(0, 2))
+        return canvas
 
     def on_icon_hover(self, widget, active_color):
         """Standard hover animation, disabled if clickthrough is on"""
@@ -819,136 +1054,269 @@ class ClaudeUsageBar:
         self.root.geometry(f'+{x}+{y}')
     
     def update_progress(self):
-        """Update UI with latest usage data"""
-        if not self.usage_data:
+        """Render a new usage payload (runs only when the data changed)"""
+        if not self.usage_windows:
+            return
+        if self.render_suspended:
+            self.render_pending = True  # Caught up by resume_rendering()
             return
-        
-        try:
-            try:
-                from dateutil import parser as date_parser
-            except ImportError:
-                import subprocess
-                subprocess.check_call([sys.executable, "-m", "pip", "install", "python-dateutil"])
-                from dateutil import parser as date_parser
-            
-            # Extract 5-hour usage
-            five_hour = self.usage_data.get('five_hour', {})
-            five_hour_utilization = five_hour.get('utilization', 0.0)
-            five_hour_resets_at = five_hour.get('resets_at')
-            
-            # Display 5-hour usage
-            self.five_hour_usage_label.config(text=f"{five_hour_utilization:.1f}% used")
-            
-            # Update 5-hour progress bar
-            bar_width = int((five_hour_utilization / 100) * 284)
-            self.five_hour_progress_fill.place(width=bar_width)
-            
-            # Color based on usage for 5-hour
-            if five_hour_utilization >= 90:
-                self.five_hour_progress_fill.config(bg='#ff4444')
-            elif five_hour_utilization >= 70:
-                self.five_hour_progress_fill.config(bg='#ffaa44')
-            else:
-                self.five_hour_progress_fill.config(bg='#CC785C')
-            
-            # Update 5-hour reset timer
-            if five_hour_resets_at:
-                try:
-                    reset_time = date_parser.parse(five_hour_resets_at)
-                    now = datetime.now(reset_time.tzinfo)
-                    time_left = reset_time - now
-                    
-                    if time_left.total_seconds() > 0:
-                        time_str = self.format_time_remaining(time_left.total_seconds())
-                        self.five_hour_reset_label.config(text=f"Resets in: {time_str}")
-                    else:
-                        self.five_hour_reset_label.config(text="Resetting soon...")
-                except:
-                    self.five_hour_reset_label.config(text="Reset time error")
-            else:
-                if five_hour_utilization == 0:
-                    self.five_hour_reset_label.config(text="No active period")
-                else:
-                    self.five_hour_reset_label.config(text="Reset time unavailable")
-            
-            # Extract weekly usage (note: API uses 'seven_day' not 'weekly')
-            weekly = self.usage_data.get('seven_day', {})
-            weekly_utilization = weekly.get('utilization', 0.0)
-            weekly_resets_at = weekly.get('resets_at')
-            
-            # Display weekly usage
-            self.weekly_usage_label.config(text=f"{weekly_utilization:.1f}% used")
-            
-            # Update weekly progress bar
-            weekly_bar_width = int((weekly_utilization / 100) * 284)
-            self.weekly_progress_fill.place(width=weekly_bar_width)
-            
-            # Color based on usage for weekly
-            if weekly_utilization >= 90:
-                self.weekly_progress_fill.config(bg='#ff4444')
-            elif weekly_utilization >= 70:
-                self.weekly_progress_fill.config(bg='#ffaa44')
-            else:
-                self.weekly_progress_fill.config(bg='#8B6BB7')
-            
-            # Update weekly reset timer
-            if weekly_resets_at:
-                try:
-                    reset_time = date_parser.parse(weekly_resets_at)
-                    now = datetime.now(reset_time.tzinfo)
-                    time_left = reset_time - now
-                    
-                    if time_left.total_seconds() > 0:
-                        time_str = self.format_time_remaining(time_left.total_seconds())
-                        self.weekly_reset_label.config(text=f"Resets in: {time_str}")
-                    else:
-                        self.weekly_reset_label.config(text="Resetting soon...")
-                except:
-                    self.weekly_reset_label.config(text="Reset time error")
-            else:
-                if weekly_utilization == 0:
-                    self.weekly_reset_label.config(text="No active period")
-                else:
-                    self.weekly_reset_label.config(text="Reset time unavailable")
 
-            # Check and send notifications
-            if NOTIFICATIONS_AVAILABLE:
-                self.check_and_send_notifications(five_hour_utilization, 'five_hour', '5-Hour')
-                self.check_and_send_notifications(weekly_utilization, 'weekly', 'Weekly')
+        self.render_pending = False
+        try:
+            for window in USAGE_WINDOWS:
+                self.render_usage(window, self.usage_windows[window]['utilization'])
+            self.render_titles()
 
-            # Update last utilization values for next comparison
-            self.last_five_hour_utilization = five_hour_utilization
-            self.last_weekly_utilization = weekly_utilization
+            # Reset timers for the new payload; the ticker keeps them running
+            self.update_countdowns()
 
         except Exception as e:
-            self.five_hour_usage_label.config(text="Error displaying usage")
-            self.weekly_usage_label.config(text="Error displaying usage")
+            for window in USAGE_WINDOWS:
+                self.render_usage_text(window, "Error displaying usage")
+
+    def update_sparklines(self):
+        """Draw the samples collected since the last call (one segment each)"""
+        if self.render_suspended:
+            return  # resume_rendering() catches up
+        # Read the new samples straight from sample_ring (one record per window per fetch)
+        records, self.history_drawn = self.sample_ring.since(
+            self.history_drawn, limit=self.sparkline_samples * len(USAGE_WINDOWS)
+        )
+        values = {window: [] for window in USAGE_WINDOWS}
+        for _, window, utilization, _ in records:
+            values[window].append(utilization)
+        for window, sparkline in self.sparklines.items():
+            sparkline.extend(values[window])
+
+    def check_usage_notifications(self):
+        """Notify on threshold crossings (also while the window is hidden)"""
+        five_hour_utilization = self.usage_windows['five_hour']['utilization']
+        weekly_utilization = self.usage_windows['seven_day']['utilization']
+
+        # Check and send notifications
+        if NOTIFICATIONS_AVAILABLE:
+            self.check_and_send_notifications(five_hour_utilization, 'five_hour', '5-Hour')
+            self.check_and_send_notifications(weekly_utilization, 'weekly', 'Weekly')
+
+    # Usage state is read from the memory-mapped sample ring, not kept on the instance
+
+    @property
+    def usage_data(self):
+        """The latest payload, rebuilt from sample_ring"""
+        data = {}
+        for window in USAGE_WINDOWS:
+            latest = self.sample_ring.latest(window)
+            if latest:
+                _, utilization, reset_epoch = latest
+                resets_at = None
+                if not math.isnan(reset_epoch):
+                    resets_at = datetime.fromtimestamp(reset_epoch, timezone.utc).isoformat()
+                data[window] = {'utilization': round(utilization, 2), 'resets_at': resets_at}
+        return data or None
+
+    @property
+    def last_five_hour_utilization(self):
+        """5-hour utilization before the payload being shown (for threshold crossings)"""
+        return self.sample_ring.utilization_before('five_hour', self.last_changed_at or time.time())
+
+    @property
+    def last_weekly_utilization(self):
+        return self.sample_ring.utilization_before('seven_day', self.last_changed_at or time.time())
+
+    def show_cached_usage(self):
+        """Render the last payload recorded in sample_ring, marked as stale"""
+        data = self.usage_data
+        latest = self.sample_ring.latest('five_hour')
+        if not data or not latest:
+            return
+
+        self.stale_since = latest[0]
+        self.usage_windows = normalize_usage(data)
+        self.update_progress()
+        self.update_sparklines()
+        self.update_tray_icon()
+
+    def render_usage(self, window, utilization):
+        """Show a window's utilization as text, bar width and bar color"""
+        text = f"{utilization:.1f}% used"
+        color = usage_color(window, utilization)
+        if self.usage_canvas:
+            self.usage_canvas.set_usage(window, text, utilization / 100, color)
+        else:
+            label, fill, _ = self.usage_widgets[window]
+            self.view.config(label, text=text)
+            self.view.place(fill, relwidth=min(max(utilization / 100, 0.0), 1.0))
+            self.view.config(fill, bg=color)
+
+    def render_titles(self):
+        """Section titles, marked while cached usage is shown (hidden in compact mode; see the status tooltip)"""
+        stale = ''
+        if self.stale_since:
+            stale = f" · stale, {self.format_age(time.time() - self.stale_since)}"
+        for window in USAGE_WINDOWS:
+            text = WINDOW_TITLES[window] + stale
+            if self.usage_canvas:
+                self.usage_canvas.set_title(window, text)
+            else:
+                self.view.config(self.title_widgets[window], text=text)
+
+    def render_usage_text(self, window, text):
+        if self.usage_canvas:
+            self.usage_canvas.set_usage_text(window, text)
+        else:
+            self.view.config(self.usage_widgets[window][0], text=text)
+
+    def render_reset(self, window, text, color='#666666'):
+        if self.usage_canvas:
+            self.usage_canvas.set_reset(window, text, color)
+        else:
+            self.view.config(self.usage_widgets[window][2], text=text, fg=color)
+
+    def drain_ui_events(self):
+        """Handle everything worker threads posted since the last tick"""
+        handlers = {
+            'api_status': self.apply_api_status,
+            'usage': self.apply_usage,
+            'history': lambda _: self.update_sparklines(),
+            'forecast': self.apply_forecasts,
+            'auth_error': lambda _: self.handle_auth_error(),
+            'login_status': self.show_login_status,
+            'login_success': self.complete_login,
+            'show_window': lambda _: self.show_window(),
+            'show_settings': lambda _: self.show_settings(None),
+            'quit': lambda _: self.quit_app(),
+        }
+        events = self.ui_events.drain()
+        try:
+            for kind, payload in events:
+                handlers[kind](payload)
+        finally:
+            # Back off while idle so a hidden widget doesn't wake 10 times a second
+            if events:
+                self.ui_event_interval = UI_EVENT_INTERVAL
+            else:
+                idle_cap = UI_EVENT_SUSPENDED_INTERVAL if self.render_suspended else UI_EVENT_IDLE_INTERVAL
+                self.ui_event_interval = min(self.ui_event_interval * 2, idle_cap)
+            self.root.after(self.ui_event_interval, self.drain_ui_events)
+
+    def start_countdown_ticker(self):
+        """Start the one 1-second ticker that keeps the "Resets in" labels current"""
+        if self.countdown_job is None and not self.render_suspended:
+            self.tick_countdowns()
+
+    def stop_countdown_ticker(self):
+        if self.countdown_job is not None:
+            self.root.after_cancel(self.countdown_job)
+            self.countdown_job = None
+
+    def suspend_rendering(self):
+        """Stop drawing while nobody can see the widget (tray or collapsed strip).
+
+        Polling and notifications carry on; new payloads are only stored.
+        """
+        self.render_suspended = True
+        self.stop_countdown_ticker()
+
+    def resume_rendering(self):
+        """Catch up with one render and restart the countdown ticker"""
+        if not self.render_suspended:
+            return
+        self.render_suspended = False
+        if self.render_pending:
+            self.update_progress()
+        self.update_sparklines()
+        self.start_countdown_ticker()
+
+    def tick_countdowns(self):
+        self.update_countdowns()
+        self.countdown_job = self.root.after(1000, self.tick_countdowns)
+
+    def update_countdowns(self):
+        """Refresh only the "Resets in" labels"""
+        windows = self.usage_windows
+        if not windows:
+            return
 
-        # Schedule next update
-        self.root.after(1000, self.update_progress)
+        now = time.monotonic()
+        for window in USAGE_WINDOWS:
+            forecast = self.usage_forecasts.get(window)
+            text = self.reset_text(windows[window], now)
+            if forecast and forecast['before_reset'] and windows[window]['reset_deadline'] is not None:
+                # The projection was made at poll time; only the countdown moves per tick
+                limit_left = forecast['limit_deadline'] - now
+                text += f" · 100% in {self.format_time_remaining(limit_left)}" if limit_left > 0 else " · at limit"
+                self.render_reset(window, text, '#ffaa44')
+            else:
+                self.render_reset(window, text)
+        if self.stale_since:
+            self.render_titles()  # Keep the age current
+
+    def apply_forecasts(self, forecasts):
+        """Main thread: take over the burn-rate projections of the latest poll"""
+        self.usage_forecasts = forecasts
+        if not self.render_suspended:
+            self.update_countdowns()
+
+    def reset_text(self, window, now):
+        """Countdown text for a normalized usage window"""
+        if window['reset_error']:
+            return "Reset time error"
+        if window['reset_deadline'] is None:
+            if window['utilization'] == 0:
+                return "No active period"
+            return "Reset time unavailable"
+
+        time_left = window['reset_deadline'] - now
+        if time_left > 0:
+            return f"Resets in: {self.format_time_remaining(time_left)}"
+        return "Resetting soon..."
     
     def manual_refresh(self, event=None):
         """Manually trigger refresh"""
         if self.clickthrough_enabled: return
-        def refresh():
-            data = self.fetch_usage_data()
-            if data:
-                self.usage_data = data
-                self.root.after(0, self.update_progress)
-        
-        threading.Thread(target=refresh, daemon=True).start()
+        self.request_refresh()
     
     def show_settings(self, event=None):
         if self.clickthrough_enabled: return
-        # Don't open multiple settings windows
         if self.settings_window and tk.Toplevel.winfo_exists(self.settings_window):
-            self.settings_window.lift()
-            self.settings_window.focus_force()
-            return
-        
+            if self.settings_window.state() != 'withdrawn':
+                # Already open - keep any unsaved edits
+                self.settings_window.lift()
+                self.settings_window.focus_force()
+                return
+        else:
+            # Built once on first open, then only hidden and shown again
+            self.build_settings_window()
+
+        self.sync_settings()
+        self.settings_window.deiconify()
+        self.settings_window.lift()
+        self.settings_window.focus_force()
+
+    def sync_settings(self):
+        """Load the current config into the settings window's variables"""
+        session_key = self.config.get('session_key') or 'Not logged in'
+        display_key = f"{session_key[:15]}..." if len(session_key) > 15 else session_key
+        self.settings_session_label.config(text=f"Session: {display_key}")
+
+        settings = self.settings_vars
+        settings['opacity'].set(self.config['opacity'])
+        self.settings_opacity_label.config(text=f"{int(self.config['opacity'] * 100)}%")
+        settings['poll_interval'].set(self.config['poll_interval'])
+        settings['adaptive_polling'].set(self.config.get('adaptive_polling', False))
+        settings['minimize_to_tray'].set(TRAY_AVAILABLE and self.config.get('minimize_to_tray', False))
+        settings['auto_refresh_session'].set(self.config.get('auto_refresh_session', False))
+        settings['snap_mode'].set(self.config.get('snap_mode', 'off'))
+        settings['notification_thresholds'].set(
+            ', '.join(str(t) for t in self.config.get('notification_thresholds', [80, 95, 99, 100]))
+        )
+
+    def build_settings_window(self):
+        """Create the settings Toplevel and its widgets (values come from sync_settings)"""
         self.settings_window = tk.Toplevel(self.root)
+        self.settings_window.withdraw()
         self.settings_window.title("Settings")
-        self.settings_window.geometry("400x650")
+        self.settings_window.geometry("400x680")
         self.settings_window.attributes('-topmost', True)
         self.settings_window.configure(bg='#1a1a1a')
         self.settings_window.protocol("WM_DELETE_WINDOW", lambda: self.close_settings())
@@ -963,16 +1331,13 @@ class ClaudeUsageBar:
         ).pack(pady=(20, 5))
         
         # Show session key snippet
-        session_key = self.config.get('session_key') or 'Not logged in'
-        display_key = f"{session_key[:15]}..." if len(session_key) > 15 else session_key
-        
-        tk.Label(
+        self.settings_session_label = tk.Label(
             self.settings_window,
-            text=f"Session: {display_key}",
             font=('Segoe UI', 8),
             fg='#666666',
             bg='#1a1a1a'
-        ).pack(pady=(0, 5))
+        )
+        self.settings_session_label.pack(pady=(0, 5))
         
         # Separator
         separator1 = tk.Frame(self.settings_window, bg='#333333', height=1)
@@ -990,16 +1355,16 @@ class ClaudeUsageBar:
         opacity_frame = tk.Frame(self.settings_window, bg='#1a1a1a')
         opacity_frame.pack(pady=5)
         
-        opacity_var = tk.DoubleVar(value=self.config['opacity'])
+        opacity_var = tk.DoubleVar()
         opacity_value_label = tk.Label(
             opacity_frame,
-            text=f"{int(opacity_var.get() * 100)}%",
             font=('Segoe UI', 9),
             fg='#888888',
             bg='#1a1a1a',
             width=5
         )
         opacity_value_label.pack(side='right', padx=(10, 0))
+        self.settings_opacity_label = opacity_value_label
         
         def update_opacity_label(val):
             opacity_value_label.config(text=f"{int(float(val) * 100)}%")
@@ -1041,7 +1406,7 @@ class ClaudeUsageBar:
         interval_frame = tk.Frame(self.settings_window, bg='#1a1a1a')
         interval_frame.pack(pady=5)
         
-        interval_var = tk.IntVar(value=self.config['poll_interval'])
+        interval_var = tk.IntVar()
         
         # Minus button
         def decrease_interval():
@@ -1107,14 +1472,27 @@ class ClaudeUsageBar:
             font=('Segoe UI', 8),
             fg='#666666',
             bg='#1a1a1a'
-        ).pack(pady=(0, 10))
+        ).pack(pady=(0, 2))
+
+        adaptive_var = tk.BooleanVar()
+        tk.Checkbutton(
+            self.settings_window,
+            text="Adaptive (faster while usage climbs)",
+            variable=adaptive_var,
+            font=('Segoe UI', 9),
+            fg='#cccccc',
+            bg='#1a1a1a',
+            selectcolor='#2a2a2a',
+            activebackground='#1a1a1a',
+            activeforeground='#cccccc'
+        ).pack(pady=(0, 5))
 
         # Separator
         tk.Frame(self.settings_window, bg='#333333', height=1).pack(fill='x', padx=20, pady=10)
 
         # System Tray option
         if TRAY_AVAILABLE:
-            tray_var = tk.BooleanVar(value=self.config.get('minimize_to_tray', False))
+            tray_var = tk.BooleanVar()
             tray_check = tk.Checkbutton(
                 self.settings_window,
                 text="Minimize to System Tray",
@@ -1128,10 +1506,10 @@ class ClaudeUsageBar:
             )
             tray_check.pack(pady=5)
         else:
-            tray_var = tk.BooleanVar(value=False)
+            tray_var = tk.BooleanVar()
 
         # Auto Refresh Session
-        auto_refresh_var = tk.BooleanVar(value=self.config.get('auto_refresh_session', False))
+        auto_refresh_var = tk.BooleanVar()
         auto_refresh_check = tk.Checkbutton(
             self.settings_window,
             text="Auto-refresh expired sessions",
@@ -1157,7 +1535,7 @@ class ClaudeUsageBar:
             bg='#1a1a1a'
         ).pack(pady=(5, 5))
 
-        snap_var = tk.StringVar(value=self.config.get('snap_mode', 'off'))
+        snap_var = tk.StringVar()
         snap_frame = tk.Frame(self.settings_window, bg='#1a1a1a')
         snap_frame.pack(pady=5)
 
@@ -1188,8 +1566,7 @@ class ClaudeUsageBar:
                 bg='#1a1a1a'
             ).pack(pady=(5, 5))
 
-            thresholds_str = ', '.join(str(t) for t in self.config.get('notification_thresholds', [80, 95, 99, 100]))
-            thresholds_var = tk.StringVar(value=thresholds_str)
+            thresholds_var = tk.StringVar()
             thresholds_entry = tk.Entry(
                 self.settings_window,
                 textvariable=thresholds_var,
@@ -1210,12 +1587,23 @@ class ClaudeUsageBar:
                 bg='#1a1a1a'
             ).pack()
         else:
-            thresholds_var = tk.StringVar(value="80, 95, 99, 100")
+            thresholds_var = tk.StringVar()
+
+        self.settings_vars = {
+            'opacity': opacity_var,
+            'poll_interval': interval_var,
+            'adaptive_polling': adaptive_var,
+            'minimize_to_tray': tray_var,
+            'auto_refresh_session': auto_refresh_var,
+            'snap_mode': snap_var,
+            'notification_thresholds': thresholds_var,
+        }
 
         # Save button
         def save_settings():
             self.config['opacity'] = opacity_var.get()
             self.config['poll_interval'] = interval_var.get()
+            self.config['adaptive_polling'] = adaptive_var.get()
             self.config['minimize_to_tray'] = tray_var.get()
             self.config['auto_refresh_session'] = auto_refresh_var.get()
             self.config['snap_mode'] = snap_var.get()
@@ -1246,9 +1634,7 @@ class ClaudeUsageBar:
         # Logout
         def logout():
             if messagebox.askyesno("Logout", "Log out and clear session?", parent=self.settings_window):
-                self.config['session_key'] = None
-                self.config['cookie_string'] = None
-                self.save_config()
+                self.clear_session()
                 self.close_settings()
                 messagebox.showinfo("Logged Out", "Please restart the app to log in again.")
                 self.root.quit()
@@ -1270,12 +1656,12 @@ class ClaudeUsageBar:
         logout_btn.bind('<Leave>', lambda e: logout_btn.config(bg='#3a3a3a'))
     
     def close_settings(self):
+        """Hide the settings window; show_settings() reuses it"""
         if self.settings_window:
             try:
-                self.settings_window.destroy()
+                self.settings_window.withdraw()
             except:
-                pass
-            self.settings_window = None
+                self.settings_window = None
     
     def toggle_clickthrough(self, event=None):
         """Toggle clickthrough mode - makes EVERYTHING clickthrough except the icon itself"""
@@ -1365,20 +1751,43 @@ class ClaudeUsageBar:
             'ok': '#44ff44',      # Green
             'warning': '#ffaa44', # Yellow/Orange
             'error': '#ff4444',   # Red
+            'paused': '#aa3333',  # Dark red - circuit open
             'unknown': '#888888'  # Gray
         }
         color = colors.get(self.api_status, '#888888')
-        self.api_status_dot.config(fg=color)
+        self.view.config(self.api_status_dot, fg=color)
 
     def show_api_status_tooltip(self, event):
         """Show API status tooltip"""
+        changed = ''
+        if self.last_changed_at is not None:
+            changed = f' · usage changed {self.format_age(time.time() - self.last_changed_at)}'
+        retry_delay = self.retry_scheduler.seconds_until_retry()
+        retry_in = f' in {int(retry_delay)}s' if retry_delay is not None else ''
+        probe_delay = self.circuit_breaker.seconds_until_probe()
+        probe_in = f'probing in {int(probe_delay)}s' if probe_delay is not None else 'probing'
         status_text = {
-            'ok': 'API: Connected',
-            'warning': f'API: Retrying... ({self.last_api_error or ""})',
+            'ok': f'API: Connected{changed}',
+            'warning': f'API: Retrying{retry_in}... ({self.last_api_error or ""})',
             'error': f'API: Error ({self.last_api_error or "Unknown"})',
+            'paused': f'API: Paused after repeated errors, {probe_in} ({self.last_api_error or "Unknown"})',
             'unknown': 'API: Unknown'
         }
         text = status_text.get(self.api_status, 'API: Unknown')
+        if self.stale_since:
+            text += f"\nShowing cached usage (fetched {self.format_age(time.time() - self.stale_since)})"
+        text += f"\nWidget updates: {self.view.applied} applied, {self.view.skipped} skipped"
+        events = self.ui_events
+        text += f"\nWorker events: {events.posted} posted, {events.posted - events.handled} coalesced"
+
+        # List every org when the account belongs to more than one
+        org_usage = self.org_usage
+        if len(org_usage) > 1:
+            for entry in org_usage.values():
+                usage = entry['usage']
+                five_hour = (usage.get('five_hour') or {}).get('utilization') or 0
+                weekly = (usage.get('seven_day') or {}).get('utilization') or 0
+                text += f"\n{entry['name']}: 5h {five_hour:.0f}% · 7d {weekly:.0f}%"
 
         self.api_status_tooltip = tk.Toplevel(self.root)
         self.api_status_tooltip.wm_overrideredirect(True)
@@ -1387,6 +1796,7 @@ class ClaudeUsageBar:
         label = tk.Label(
             self.api_status_tooltip,
             text=text,
+            justify='left',
             bg='#3a3a3a',
             fg='#ffffff',
             font=('Segoe UI', 8),
@@ -1421,17 +1831,20 @@ class ClaudeUsageBar:
             draw.ellipse([4, 4, size-4, size-4], fill='#CC785C')
             return image
 
+        self.tray_images = TrayIconImages()
+        self.tray_images.prerender('five_hour')
+
         def on_show(icon, item):
-            self.root.after(0, self.show_window)
+            self.ui_events.post('show_window')
 
         def on_refresh(icon, item):
-            self.root.after(0, lambda: self.manual_refresh(None))
+            self.request_refresh()
 
         def on_settings(icon, item):
-            self.root.after(0, lambda: self.show_settings(None))
+            self.ui_events.post('show_settings')
 
         def on_exit(icon, item):
-            self.root.after(0, self.quit_app)
+            self.ui_events.post('quit')
 
         menu = pystray.Menu(
             pystray.MenuItem('Show', on_show, default=True),
@@ -1451,23 +1864,43 @@ class ClaudeUsageBar:
         # Run tray icon in separate thread
         threading.Thread(target=self.tray_icon.run, daemon=True).start()
 
+    def update_tray_icon(self):
+        """Show the 5-hour utilization in the tray, swapping images only when the bucket changes"""
+        if not self.tray_icon or not self.usage_windows:
+            return
+
+        five_hour = self.usage_windows['five_hour']['utilization']
+        weekly = self.usage_windows['seven_day']['utilization']
+        bucket = self.tray_images.bucket(five_hour)
+        key = (bucket, usage_color('five_hour', five_hour))
+        if key != self.tray_icon_key:
+            self.tray_icon_key = key
+            self.tray_icon.icon = self.tray_images.get(*key)
+
+        title = f"Claude Usage - 5h {five_hour:.0f}%, weekly {weekly:.0f}%"
+        if self.tray_icon.title != title:
+            self.tray_icon.title = title
+
     def show_window(self):
         """Show the main window"""
         self.root.deiconify()
         self.root.attributes('-topmost', True)
         self.is_hidden = False
+        if not self.collapsed:
+            self.resume_rendering()
 
     def hide_window(self):
         """Hide to system tray"""
         if TRAY_AVAILABLE and self.config.get('minimize_to_tray'):
             self.root.withdraw()
             self.is_hidden = True
+            self.suspend_rendering()
         else:
             self.quit_app()
 
     def quit_app(self):
         """Completely quit the application"""
-        self.polling_active = False
+        self.stop()
         if self.tray_icon:
             self.tray_icon.stop()
         if self.driver:
@@ -1539,17 +1972,18 @@ class ClaudeUsageBar:
         """Apply compact or normal mode to UI"""
         compact = self.config.get('compact_mode', False)
 
-        if compact:
+        if self.usage_canvas:
+            # Canvas renderer: just move and hide items
+            self.usage_canvas.set_compact(compact)
+        elif compact:
             # Hide labels and reset times, show only progress bars with percentages
             self.five_hour_title.pack_forget()
             self.five_hour_reset_label.pack_forget()
             self.weekly_title.pack_forget()
             self.weekly_reset_label.pack_forget()
             self.separator.pack_forget()
-
-            # Resize window to compact
-            self.root.geometry('300x90')
-            self.compact_btn.config(text="▭")  # Change icon to indicate expand
+            self.five_hour_sparkline_canvas.pack_forget()
+            self.weekly_sparkline_canvas.pack_forget()
         else:
             # Rebuild normal layout - need to repack in order
             for widget in self.content_frame.winfo_children():
@@ -1559,6 +1993,7 @@ class ClaudeUsageBar:
             self.five_hour_title.pack(fill='x', pady=(0, 2))
             self.five_hour_usage_label.pack(fill='x', pady=(0, 2))
             self.five_hour_progress_bg.pack(fill='x', pady=(0, 2))
+            self.five_hour_sparkline_canvas.pack(fill='x', pady=(0, 2))
             self.five_hour_reset_label.pack(fill='x', pady=(0, 10))
 
             self.separator.pack(fill='x', pady=(0, 8))
@@ -1566,10 +2001,16 @@ class ClaudeUsageBar:
             self.weekly_title.pack(fill='x', pady=(0, 2))
             self.weekly_usage_label.pack(fill='x', pady=(0, 2))
             self.weekly_progress_bg.pack(fill='x', pady=(0, 2))
+            self.weekly_sparkline_canvas.pack(fill='x', pady=(0, 2))
             self.weekly_reset_label.pack(fill='x')
 
+        if compact:
+            # Resize window to compact
+            self.root.geometry(COMPACT_SIZE)
+            self.compact_btn.config(text="▭")  # Change icon to indicate expand
+        else:
             # Resize window to normal
-            self.root.geometry('300x240')
+            self.root.geometry(NORMAL_SIZE)
             self.compact_btn.config(text="▬")  # Change icon to indicate compact
 
     def get_screen_geometry(self):
@@ -1690,9 +2131,11 @@ class ClaudeUsageBar:
         self.collapsed = False
         # Restore full window
         if self.config.get('compact_mode'):
-            self.root.geometry('300x90')
+            self.root.geometry(COMPACT_SIZE)
         else:
-            self.root.geometry('300x240')
+            self.root.geometry(NORMAL_SIZE)
+        if not self.is_hidden:
+            self.resume_rendering()
 
     def collapse_to_edge(self, event=None):
         """Collapse window when mouse leaves (for edge snap)"""
@@ -1708,6 +2151,7 @@ class ClaudeUsageBar:
             return  # Mouse still inside
 
         self.collapsed = True
+        self.suspend_rendering()
         # Show only a thin strip
         if self.snapped_edge in ['left', 'right']:
             self.root.geometry(f'10x{wh}')
@@ -1725,6 +2169,7 @@ class ClaudeUsageBar:
     
     def run(self):
         self.root.mainloop()
+        self.config_writer.flush()  # Logout and the login dialog quit without quit_app()
 
 if __name__ == '__main__':
     app = ClaudeUsageBar()
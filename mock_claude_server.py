@@ -0,0 +1,220 @@
+"""Local stand-in for the claude.ai usage API.
+
+Serves /api/organizations and /api/organizations/{id}/usage so the widget's
+polling, retry and circuit-breaker behaviour can be exercised offline and
+under fault load. Point the widget at it via config.json:
+
+    "api_base_url": "http://127.0.0.1:8765",
+    "transport": "requests"
+
+Example: 200ms latency, 10% rate limiting and 5% server errors:
+
+    python mock_claude_server.py --latency 200 --rate-429 0.1 --rate-5xx 0.05
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+USAGE_PATH = re.compile(r'^/api/organizations/([^/]+)/usage$')
+
+
+class UsageWindow:
+    """A usage window whose utilization climbs steadily and resets on schedule"""
+
+    def __init__(self, length, rate):
+        self.length = length  # seconds
+        self.rate = rate  # utilization points per second
+        self.started = time.time()
+
+    def snapshot(self):
+        now = time.time()
+        if now - self.started >= self.length:
+            self.started = now
+        utilization = min(100.0, (now - self.started) * self.rate)
+        resets_at = datetime.fromtimestamp(self.started + self.length, timezone.utc)
+        return {
+            'utilization': round(utilization, 1),
+            'resets_at': resets_at.isoformat()
+        }
+
+
+class MockClaudeServer:
+    """Threaded HTTP server with configurable latency and fault injection.
+
+    Fault rates are probabilities per request: 401 (session expired), 429
+    (rate limited, with Retry-After), 5xx (server error) and timeout (the
+    request hangs for hang_seconds before the connection is dropped).
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, orgs=1, latency=0.0, jitter=0.0,
+                 rate_401=0.0, rate_429=0.0, rate_5xx=0.0, rate_timeout=0.0,
+                 retry_after=5, hang_seconds=30, five_hour_rate=0.01, seven_day_rate=0.001,
+                 seed=None):
+        self.latency = latency / 1000.0
+        self.jitter = jitter / 1000.0
+        self.faults = [
+            ('timeout', rate_timeout),
+            (401, rate_401),
+            (429, rate_429),
+            (503, rate_5xx),
+        ]
+        self.retry_after = retry_after
+        self.hang_seconds = hang_seconds
+        self.random = random.Random(seed)
+        self.orgs = [
+            {'uuid': f'00000000-0000-4000-8000-{i:012d}', 'name': f'Mock Org {i + 1}'}
+            for i in range(orgs)
+        ]
+        self.windows = {
+            org['uuid']: {
+                'five_hour': UsageWindow(5 * 3600, five_hour_rate),
+                'seven_day': UsageWindow(7 * 24 * 3600, seven_day_rate),
+            }
+            for org in self.orgs
+        }
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass  # Keep load tests quiet; see print_stats()
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def handle(self, request):
+        path = request.path.split('?', 1)[0]
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+        fault = self.pick_fault()
+        if fault == 'timeout':
+            self.record(path, 'timeout')
+            time.sleep(self.hang_seconds)
+            request.close_connection = True
+            return
+        if fault is not None:
+            headers = {'Retry-After': str(self.retry_after)} if fault == 429 else {}
+            self.respond(request, path, fault, {'error': 'injected fault'}, headers)
+            return
+
+        if path == '/api/organizations':
+            self.respond(request, path, 200, self.orgs)
+            return
+
+        match = USAGE_PATH.match(path)
+        if match and match.group(1) in self.windows:
+            windows = self.windows[match.group(1)]
+            with self.lock:
+                payload = {name: window.snapshot() for name, window in windows.items()}
+            self.respond(request, path, 200, payload)
+            return
+
+        self.respond(request, path, 404, {'error': 'not found'})
+
+    def pick_fault(self):
+        roll = self.random.random()
+        for fault, rate in self.faults:
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+    def respond(self, request, path, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.record(path, status)
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(body)
+
+    def record(self, path, outcome):
+        endpoint = 'usage' if USAGE_PATH.match(path) else path
+        with self.lock:
+            self.stats[(endpoint, outcome)] += 1
+
+    def start(self):
+        """Serve in a background thread (for use from scripts and benchmarks)"""
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def print_stats(self):
+        with self.lock:
+            items = sorted(self.stats.items(), key=lambda item: str(item[0]))
+        print(f"{'endpoint':<24}{'outcome':<10}{'count':>8}")
+        for (endpoint, outcome), count in items:
+            print(f"{endpoint:<24}{str(outcome):<10}{count:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--orgs', type=int, default=1, help='number of organizations')
+    parser.add_argument('--latency', type=float, default=0, help='added latency per request (ms)')
+    parser.add_argument('--jitter', type=float, default=0, help='random extra latency up to this many ms')
+    parser.add_argument('--rate-401', type=float, default=0, help='fraction of requests answered 401')
+    parser.add_argument('--rate-429', type=float, default=0, help='fraction of requests answered 429')
+    parser.add_argument('--rate-5xx', type=float, default=0, help='fraction of requests answered 503')
+    parser.add_argument('--rate-timeout', type=float, default=0, help='fraction of requests that hang')
+    parser.add_argument('--retry-after', type=int, default=5, help='Retry-After seconds sent with 429')
+    parser.add_argument('--hang', type=float, default=30, help='seconds a hanging request stalls')
+    parser.add_argument('--five-hour-rate', type=float, default=0.01,
+                        help='5-hour utilization growth (points per second)')
+    parser.add_argument('--seven-day-rate', type=float, default=0.001,
+                        help='weekly utilization growth (points per second)')
+    parser.add_argument('--seed', type=int, default=None, help='seed for reproducible fault patterns')
+    args = parser.parse_args()
+
+    server = MockClaudeServer(
+        host=args.host,
+        port=args.port,
+        orgs=args.orgs,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_401=args.rate_401,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        rate_timeout=args.rate_timeout,
+        retry_after=args.retry_after,
+        hang_seconds=args.hang,
+        five_hour_rate=args.five_hour_rate,
+        seven_day_rate=args.seven_day_rate,
+        seed=args.seed,
+    )
+    print(f"Mock claude.ai API on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        server.print_stats()
+
+
+if __name__ == '__main__':
+    main()